@@ -0,0 +1,100 @@
+"""multi-process throughput and consistency benchmark for the shared (SQLite/WAL) session store.
+
+run from the backend directory:
+    python -m benchmarks.session_store_benchmark --workers 1 2 4 --players 64 --ops 300
+
+each worker process plays the part of a uvicorn worker: its own PlayerSessions over the same
+SQLite file, applying turns (load and claim the latest version -> mutate -> compare-and-set) to random players
+and retrying on version conflicts. --work-ms emulates the CPU time of a request (prompt building,
+parsing), which is what extra worker processes parallelize. after the run every applied turn must
+be present in the stored states, i.e. no update was lost to a concurrent writer.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.game_state import GameState
+from utils.player_sessions import PlayerSessions
+from utils.session_store import SQLiteSessionStore, SessionVersionConflict
+
+def busy(milliseconds: float):
+    end = time.perf_counter() + milliseconds / 1000
+    while time.perf_counter() < end:
+        pass
+
+def worker(db_path: str, worker_id: int, players: int, ops: int, work_ms: float, results):
+    sessions = PlayerSessions(SQLiteSessionStore(db_path))
+    rng = random.Random(worker_id)
+    applied, conflicts = 0, 0
+    for index in range(ops):
+        player_id = f"player-{rng.randrange(players)}"
+        while True:
+            try:
+                with sessions.session(player_id) as game_state:
+                    busy(work_ms)
+                    game_state.add_conversation("player", f"{worker_id}-{index}")
+                break
+            except SessionVersionConflict:
+                conflicts += 1
+        applied += 1
+    results.put((applied, conflicts))
+
+def run(db_path: str, workers: int, players: int, ops: int, work_ms: float):
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    sessions = PlayerSessions(SQLiteSessionStore(db_path))
+    for index in range(players):
+        game_state = GameState()
+        game_state.player_id = f"player-{index}"
+        sessions.put(game_state.player_id, game_state)
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(db_path, worker_id, players, ops, work_ms, results))
+        for worker_id in range(workers)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    applied = sum(outcome[0] for outcome in outcomes)
+    conflicts = sum(outcome[1] for outcome in outcomes)
+    store = SQLiteSessionStore(db_path)
+    stored_turns = sum(len(store.load(f"player-{index}")[0].conversation_history) for index in range(players))
+    return applied, conflicts, stored_turns, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--players", type=int, default=64)
+    parser.add_argument("--ops", type=int, default=300, help="turns per worker")
+    parser.add_argument("--work-ms", type=float, default=2.0, help="emulated CPU time per request")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="session_store_"), "sessions.db")
+    print(f"{'workers':>8} {'turns':>8} {'conflicts':>10} {'seconds':>8} {'turns/s':>9} {'speedup':>8}  consistent")
+    baseline = None
+    failed = False
+    for workers in args.workers:
+        applied, conflicts, stored_turns, elapsed = run(db_path, workers, args.players, args.ops, args.work_ms)
+        throughput = applied / elapsed
+        baseline = baseline or throughput
+        consistent = stored_turns == applied
+        failed = failed or not consistent
+        print(f"{workers:>8} {applied:>8} {conflicts:>10} {elapsed:>8.2f} {throughput:>9.1f} {throughput / baseline:>7.2f}x  "
+              f"{'yes' if consistent else f'NO ({stored_turns} stored)'}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""concurrency stress test for per-player sessions.
+
+run from the backend directory:
+    python -m benchmarks.session_stress --players 1 --threads 16 --ops 400
+    python -m benchmarks.session_stress --players 1 --threads 16 --ops 400 --unsafe   # without session locks
+
+many threads hammer the same player(s) with chat, enemy-defeated, reset-enemy, next-stage and
+status calls. OpenAI, S3 and the vector store are replaced by in-process fakes with a fixed latency,
+so no API key is needed. the run fails if mutations of one player ever overlap, two turns interleave
+in the conversation history, a stage is skipped, or a service logs an error.
+"""
+import argparse
+import base64
+import io
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, redirect_stdout
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from utils import clients
+from utils.game_state import GameState
+from utils.player_sessions import player_sessions
+from services.game_manager import GameManager
+
+FULL_PLAYER_INFO = {
+    "name": "Min", "age": 24, "location": "Seoul", "occupation": "developer",
+    "personality_traits": ["kind", "curious", "shy"], "likes": ["music", "hiking", "books", "cooking"],
+    "life_goal": "travel the world", "fears": ["the dark"], "background": "grew up by the sea", "extra_info": None
+}
+
+class FakeCompletions:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def create(self, **kwargs):
+        time.sleep(self.latency)
+        response_format = kwargs.get("response_format")
+        if response_format:
+            properties = response_format["json_schema"]["schema"]["properties"]
+            info = {field: FULL_PLAYER_INFO.get(field) for field in properties}
+            if "reply" in properties:
+                info.update(player_info={field: FULL_PLAYER_INFO.get(field) for field in properties["player_info"]["properties"]},
+                            reply="Tell me more.", next_question=None)
+            content = json.dumps(info)
+        else:
+            content = "Map Name: Quiet Harbor\nDescription: a calm harbor town" if kwargs.get("max_tokens") == 200 else "Tell me more."
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10, total_tokens=110, prompt_tokens_details=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content, refusal=None))], usage=usage)
+
+class FakeImages:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def generate(self, **kwargs):
+        time.sleep(self.latency)
+        return SimpleNamespace(data=[SimpleNamespace(b64_json=base64.b64encode(b"png").decode())], usage=None)
+
+class FakeVectorStore:
+    def __init__(self):
+        self.saved = {}
+
+    def add_conversation(self, *args, **kwargs): pass
+    def add_player_context(self, *args, **kwargs): pass
+    def delete_player_data(self, *args, **kwargs): pass
+    def mark_player_completed(self, *args, **kwargs): pass
+    def save_game_state(self, player_id, state_json, stage): self.saved[player_id] = state_json
+    def load_game_state(self, player_id): return self.saved.get(player_id)
+
+class FakeRetriever:
+    def retrieve(self, *args, **kwargs): return []
+
+class ErrorLogCollector(logging.Handler):
+    """collects error log records; services log failed turns instead of raising"""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(f"{record.name}: {record.getMessage()}")
+
+class OverlapDetector:
+    """records when two threads are inside a player's critical sections at the same time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inside = defaultdict(Counter)  # player id -> thread id -> depth
+        self.violations = []
+
+    def wrap(self, fn, player_of):
+        def wrapper(*args, **kwargs):
+            player_id, thread_id = player_of(*args, **kwargs), threading.get_ident()
+            with self._lock:
+                others = [t for t, depth in self._inside[player_id].items() if depth and t != thread_id]
+                if others:
+                    self.violations.append(f"{fn.__name__} overlapped another mutation of {player_id}")
+                self._inside[player_id][thread_id] += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._inside[player_id][thread_id] -= 1
+        return wrapper
+
+def install_fakes(manager: GameManager, latency: float):
+    clients.openai_client._instance = SimpleNamespace(
+        chat=SimpleNamespace(completions=FakeCompletions(latency)), images=FakeImages(latency)
+    )
+    clients.s3_client._instance = SimpleNamespace(put_object=lambda **kwargs: None)
+    manager.npc_service._vector_store._instance = FakeVectorStore()
+    manager.npc_service._retriever._instance = FakeRetriever()
+
+def instrument(manager: GameManager, detector: OverlapDetector, advances: list):
+    manager._process_player_message = detector.wrap(manager._process_player_message, lambda player_id, *a, **k: player_id)
+    manager._advance_to_next_stage = detector.wrap(manager._advance_to_next_stage, lambda player_id, *a, **k: player_id)
+    stage_manager = manager.npc_service.stage_manager
+    stage_manager.is_stage_complete = detector.wrap(stage_manager.is_stage_complete, lambda game_state, *a, **k: game_state.player_id)
+
+    advance_stage = GameState.advance_stage
+    advances_lock = threading.Lock()
+
+    def recording_advance(game_state):
+        before = game_state.current_stage.value
+        advance_stage(game_state)
+        with advances_lock:
+            advances.append((game_state.player_id, before, game_state.current_stage.value))
+
+    GameState.advance_stage = recording_advance
+
+def disable_session_locks():
+    @contextmanager
+    def unlocked_session(player_id, readonly=False):
+        yield player_sessions.games.get(player_id)
+    player_sessions.session = unlocked_session
+
+def worker(manager: GameManager, player_ids: list, ops: int, seed: int, errors: list, counts: Counter):
+    rng = random.Random(seed)
+    operations = ["chat"] * 5 + ["enemy_defeated"] * 2 + ["next_stage"] * 2 + ["reset_enemy", "status"]
+    for index in range(ops):
+        player_id = rng.choice(player_ids)
+        operation = rng.choice(operations)
+        try:
+            if operation == "chat":
+                manager.process_player_message(player_id, f"message {seed}-{index}: I like music and hiking")
+            elif operation == "enemy_defeated":
+                manager.mark_enemy_defeated(player_id)
+            elif operation == "next_stage":
+                manager.advance_to_next_stage(player_id)
+            elif operation == "reset_enemy":
+                manager.reset_enemy_status(player_id)
+            else:
+                manager.get_game_status(player_id)
+            counts[operation] += 1
+        except Exception as e:
+            errors.append(f"{operation}: {type(e).__name__}: {e}")
+
+def check_history(manager: GameManager, player_ids: list) -> list:
+    """every turn appends the player message and then the NPC reply; two player messages in a row mean interleaved turns"""
+    problems = []
+    for player_id in player_ids:
+        history = manager.active_games[player_id].conversation_history
+        for previous, turn in zip(history, history[1:]):
+            if previous["speaker"] == "player" and turn["speaker"] == "player":
+                problems.append(f"{player_id}: interleaved turns at {turn['message'][:40]!r}")
+    return problems
+
+def check_advances(advances: list) -> list:
+    problems = []
+    last_stage = {}
+    for player_id, before, after in advances:
+        if after != before + 1:
+            problems.append(f"{player_id}: advanced {before} -> {after}")
+        if last_stage.get(player_id, before) != before:
+            problems.append(f"{player_id}: advanced from stage {before} after reaching {last_stage[player_id]}")
+        last_stage[player_id] = after
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=400, help="operations per thread")
+    parser.add_argument("--latency", type=float, default=0.005, help="fake model call latency in seconds")
+    parser.add_argument("--burst-window", type=float, default=0.01, help="chat burst debounce window in seconds")
+    parser.add_argument("--unsafe", action="store_true", help="disable the session locks (the run should fail)")
+    args = parser.parse_args()
+
+    # generated map metadata is written relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="session_stress_"))
+    Config.CHAT_BURST_COALESCING = True  # exercise the burst path too
+    Config.CHAT_BURST_WINDOW_SECONDS = args.burst_window
+    Config.CHAT_BURST_MAX_WAIT_SECONDS = max(args.burst_window * 4, 0.05)
+    Config.QUESTION_LLM_SAMPLE_RATE = 0.0
+    # every extraction goes to the fake model, which reports complete player info, so stages can advance
+    Config.LOCAL_EXTRACTION_ENABLED = False
+    Config.MODEL_RATE_LIMITS = {}  # the fakes have no account limits
+    logging.disable(logging.INFO)
+    error_logs = ErrorLogCollector()
+    logging.getLogger().addHandler(error_logs)
+
+    manager = GameManager()
+    install_fakes(manager, args.latency)
+    detector, advances = OverlapDetector(), []
+    instrument(manager, detector, advances)
+    if args.unsafe:
+        disable_session_locks()
+
+    player_ids = [manager.create_new_game(f"stress-player-{index}") for index in range(args.players)]
+
+    errors, counts = [], Counter()
+    threads = [
+        threading.Thread(target=worker, args=(manager, player_ids, args.ops, seed, errors, counts))
+        for seed in range(args.threads)
+    ]
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):  # the game services log every turn
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        # let background extraction and summaries finish before checking the state
+        manager._extraction_executor.shutdown(wait=True)
+        manager.npc_service.conversation_summarizer._executor.shutdown(wait=True)
+
+    errors += [f"logged error: {message}" for message in error_logs.messages]
+    problems = detector.violations + check_history(manager, player_ids) + check_advances(advances)
+    total = sum(counts.values())
+    print(f"\nplayers={args.players} threads={args.threads} operations={total} errors={len(errors)} "
+          f"elapsed={elapsed:.2f}s throughput={total / elapsed:.1f} ops/s")
+    print(f"operations: {dict(counts)}")
+    print(f"stages reached: {[manager.active_games[player_id].current_stage.value for player_id in player_ids]}")
+    print(f"sessions: {player_sessions.get_stats()}")
+    print(f"chat bursts: {manager.burst_coalescer.get_stats()}")
+    for error in errors[:5]:
+        print(f"❌ {error}")
+    for problem in problems[:10]:
+        print(f"❌ {problem}")
+    if errors or problems:
+        print(f"FAILED: {len(errors)} errors, {len(problems)} consistency violations")
+        sys.exit(1)
+    print("OK: per-player mutations were serialized")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""memory and recall benchmark for reduced-dimension and int8-quantized vectors.
+
+run from the backend directory:
+    python -m benchmarks.vector_storage_benchmark --vectors 20000 --queries 200
+
+vectors are synthetic (clustered, unit-normalized) so no API key is needed.
+recall@k is measured against exact float32 search over the full-dimension vectors.
+"""
+import argparse
+import time
+import numpy as np
+from sklearn.decomposition import PCA
+from vector_db.quantization import quantize_int8, dequantize_int8
+
+def make_dataset(num_vectors: int, num_queries: int, dimension: int, clusters: int, seed: int):
+    """clustered unit vectors, roughly shaped like sentence embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+
+    def sample(count):
+        labels = rng.integers(0, clusters, size=count)
+        points = centers[labels] + 0.6 * rng.normal(size=(count, dimension)).astype(np.float32)
+        return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+    return sample(num_vectors), sample(num_queries)
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    corpus = corpus / np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+    scores = queries @ corpus.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--reduced", type=int, nargs="*", default=[512, 256])
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    corpus, queries = make_dataset(args.vectors, args.queries, args.dimension, args.clusters, args.seed)
+    truth = top_k(corpus, queries, args.k)
+
+    print(f"synthetic corpus: {args.vectors} vectors x {args.dimension} dims, {args.queries} queries, recall@{args.k}")
+    print(f"{'variant':<24}{'bytes/vector':>14}{'MB per 1M':>12}{'recall':>10}{'search ms':>12}")
+
+    def report(name, dimension, int8, corpus_variant, query_variant):
+        bytes_per_vector = dimension + 4 if int8 else dimension * 4  # int8 codes + float32 scale
+        started = time.perf_counter()
+        found = top_k(corpus_variant, query_variant, args.k)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"{name:<24}{bytes_per_vector:>14}{bytes_per_vector * 1_000_000 / 2**20:>12.0f}"
+              f"{recall_at_k(found, truth):>10.3f}{elapsed_ms:>12.1f}")
+
+    def with_int8(matrix):
+        codes, scales = quantize_int8(matrix)
+        return dequantize_int8(codes, scales)
+
+    report(f"float32 {args.dimension}d", args.dimension, False, corpus, queries)
+    report(f"int8 {args.dimension}d", args.dimension, True, with_int8(corpus), queries)
+
+    for dimension in args.reduced:
+        # learned projection (PCA) stands in for shortened text-embedding-3 vectors
+        pca = PCA(n_components=dimension, random_state=args.seed).fit(corpus[: min(len(corpus), 5000)])
+        reduced_corpus = pca.transform(corpus).astype(np.float32)
+        reduced_queries = pca.transform(queries).astype(np.float32)
+        reduced_queries /= np.linalg.norm(reduced_queries, axis=1, keepdims=True)
+
+        report(f"float32 {dimension}d (PCA)", dimension, False, reduced_corpus, reduced_queries)
+        report(f"int8 {dimension}d (PCA)", dimension, True, with_int8(reduced_corpus), reduced_queries)
+
+if __name__ == "__main__":
+    main()
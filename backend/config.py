@@ -10,6 +10,170 @@ class Config:
     # Pinecone settings
     PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
     PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT", "us-east-1-aws")
+    # empty -> "game-context" for 1536-dim OpenAI vectors, otherwise a name derived from provider/dimension
+    PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "")
+    
+    # embedding settings ("openai" or "local"; 0 dimension -> provider default)
+    EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+    EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "0"))
+    # text-embedding-3-* models accept reduced dimensions (e.g. EMBEDDING_DIMENSION=256)
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+    
+    # local key-value store for texts and state blobs referenced by vector ids
+    LOCAL_STORE_PATH = os.getenv("LOCAL_STORE_PATH", "vector_db/local_store.db")
+    
+    # retrieval settings (MMR + recency decay over past conversation turns)
+    RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+    RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "20"))
+    RETRIEVAL_MMR_LAMBDA = float(os.getenv("RETRIEVAL_MMR_LAMBDA", "0.5"))
+    RETRIEVAL_HALF_LIFE_SECONDS = float(os.getenv("RETRIEVAL_HALF_LIFE_SECONDS", "3600"))
+    
+    # bounded LRU of per-player vector-store read results (invalidated on every write)
+    QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+    
+    # vector compaction: expire vectors of completed or idle games after a TTL
+    VECTOR_COMPLETED_TTL_SECONDS = int(os.getenv("VECTOR_COMPLETED_TTL_SECONDS", str(24 * 3600)))
+    VECTOR_IDLE_TTL_SECONDS = int(os.getenv("VECTOR_IDLE_TTL_SECONDS", str(7 * 24 * 3600)))
+    COMPACTOR_INTERVAL_SECONDS = int(os.getenv("COMPACTOR_INTERVAL_SECONDS", "3600"))
+    COMPACT_TO_SUMMARY = os.getenv("COMPACT_TO_SUMMARY", "true").lower() == "true"
+    COMPACT_SUMMARY_MAX_CHARS = int(os.getenv("COMPACT_SUMMARY_MAX_CHARS", "2000"))
+    
+    # rolling conversation summary settings
+    SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
+    CONVERSATION_RECENT_WINDOW = int(os.getenv("CONVERSATION_RECENT_WINDOW", "4"))  # raw turns kept in prompts
+    SUMMARY_BATCH_TURNS = int(os.getenv("SUMMARY_BATCH_TURNS", "6"))  # older turns needed before folding
+    
+    # rule-based extraction tier: skip the LLM extraction call for confident tutorial facts
+    LOCAL_EXTRACTION_ENABLED = os.getenv("LOCAL_EXTRACTION_ENABLED", "true").lower() == "true"
+    LOCAL_EXTRACTION_MIN_CONFIDENCE = float(os.getenv("LOCAL_EXTRACTION_MIN_CONFIDENCE", "0.8"))
+    
+    # retries of a schema-constrained extraction call whose output could not be parsed
+    EXTRACTION_MAX_RETRIES = int(os.getenv("EXTRACTION_MAX_RETRIES", "1"))
+    
+    # cached info-collection questions (share of cache hits still sent to the LLM for fresh variants)
+    QUESTION_CACHE_ENABLED = os.getenv("QUESTION_CACHE_ENABLED", "true").lower() == "true"
+    QUESTION_LLM_SAMPLE_RATE = float(os.getenv("QUESTION_LLM_SAMPLE_RATE", "0.1"))
+    QUESTION_CACHE_MAX_VARIANTS = int(os.getenv("QUESTION_CACHE_MAX_VARIANTS", "8"))
+    
+    # single-call mode: one structured-output call returns the extracted info delta and the NPC reply
+    SINGLE_CALL_MODE = os.getenv("SINGLE_CALL_MODE", "false").lower() == "true"
+    
+    # model routing: call site -> (model, small model for brief turns, fallback model on timeout, timeout seconds).
+    # each value can be overridden with MODEL_<CALL_SITE>, MODEL_<CALL_SITE>_SMALL, MODEL_<CALL_SITE>_FALLBACK
+    # and MODEL_<CALL_SITE>_TIMEOUT (e.g. MODEL_NPC_REPLY_SMALL=gpt-4.1-nano); an empty model disables it
+    MODEL_ROUTES = {
+        call_site: {
+            "model": os.getenv(f"MODEL_{call_site.upper()}", model),
+            "small_model": os.getenv(f"MODEL_{call_site.upper()}_SMALL", small_model),
+            "fallback_model": os.getenv(f"MODEL_{call_site.upper()}_FALLBACK", fallback_model),
+            "timeout": float(os.getenv(f"MODEL_{call_site.upper()}_TIMEOUT", str(timeout)))
+        }
+        for call_site, (model, small_model, fallback_model, timeout) in {
+            "npc_reply": ("gpt-4.1", "gpt-4.1-mini", "gpt-4.1-mini", 20),
+            "npc_turn": ("gpt-4.1", "gpt-4.1-mini", "gpt-4.1-mini", 25),
+            "stage_intro": ("gpt-4.1", "", "gpt-4.1-mini", 20),
+            "info_extraction": ("gpt-4o-mini", "", "", 10),
+            "info_question": ("gpt-4o-mini", "", "", 10),
+            "summarizer": (SUMMARY_MODEL, "", "", 30),
+            "map_suggestion": ("gpt-4o", "", "gpt-4o-mini", 20),
+            "map_image": ("gpt-image-1", "", "", 120),
+        }.items()
+    }
+    
+    # outbound call policy per call site: (overall deadline seconds, max retries, hedge slow requests).
+    # override with CALL_<CALL_SITE>_DEADLINE, CALL_<CALL_SITE>_RETRIES and CALL_<CALL_SITE>_HEDGE
+    CALL_POLICIES = {
+        call_site: {
+            "deadline": float(os.getenv(f"CALL_{call_site.upper()}_DEADLINE", str(deadline))),
+            "max_retries": int(os.getenv(f"CALL_{call_site.upper()}_RETRIES", str(max_retries))),
+            "hedge": os.getenv(f"CALL_{call_site.upper()}_HEDGE", str(hedge)).lower() == "true"
+        }
+        for call_site, (deadline, max_retries, hedge) in {
+            "default": (30, 2, False),
+            "npc_reply": (30, 2, True),
+            "npc_turn": (35, 2, True),
+            "stage_intro": (30, 2, True),
+            "info_extraction": (15, 2, False),
+            "info_question": (15, 1, False),
+            "summarizer": (60, 3, False),
+            "map_suggestion": (30, 2, False),
+            "map_image": (180, 1, False),
+        }.items()
+    }
+    RETRY_BASE_DELAY_SECONDS = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "0.5"))
+    RETRY_MAX_DELAY_SECONDS = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "4.0"))
+    # a duplicate request is sent once an attempt is slower than this latency percentile of the call site
+    HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+    HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    
+    # account rate limits per model: "model:rpm:tpm" entries (0 = unlimited); unknown models are not limited
+    MODEL_RATE_LIMITS = {
+        model.strip(): (int(rpm), int(tpm))
+        for model, rpm, tpm in (
+            item.split(":") for item in os.getenv(
+                "MODEL_RATE_LIMITS",
+                "gpt-4.1:500:30000,gpt-4.1-mini:500:200000,gpt-4o:500:30000,gpt-4o-mini:500:200000,gpt-image-1:5:0"
+            ).split(",") if item.count(":") == 2
+        )
+    }
+    # scheduling priority when a model is saturated (lower is served first)
+    CALL_PRIORITIES = {
+        "npc_reply": 0,
+        "npc_turn": 0,
+        "info_extraction": 0,
+        "info_question": 0,
+        "stage_intro": 1,
+        "map_suggestion": 2,
+        "map_image": 2,
+        "summarizer": 3,
+        "default": 2,
+    }
+    
+    # game state storage: "memory" (this process only) or "sqlite" (shared by all workers on the host, survives restarts)
+    SESSION_STORE = os.getenv("SESSION_STORE", "memory").lower()
+    SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "vector_db/sessions.db")
+    # a worker claims a player's state for the whole turn (model calls, memory writes) before any side effect;
+    # the claim expires after SESSION_LEASE_SECONDS if the worker dies, and another worker waits at most
+    # SESSION_CLAIM_TIMEOUT_SECONDS for it before answering 409
+    SESSION_LEASE_SECONDS = float(os.getenv("SESSION_LEASE_SECONDS", "120"))
+    SESSION_CLAIM_TIMEOUT_SECONDS = float(os.getenv("SESSION_CLAIM_TIMEOUT_SECONDS", "10"))
+    # uvicorn worker processes (more than one requires SESSION_STORE=sqlite, which also shares idempotency records)
+    API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+    
+    # rapid consecutive chat messages of a player are merged into one turn: the turn runs once the player
+    # has been quiet for the window (at most CHAT_BURST_MAX_WAIT_SECONDS after the first message).
+    # off by default: every turn, including a single message, then waits the full window before the
+    # model call, so it adds CHAT_BURST_WINDOW_SECONDS to each reply; keep the window short when enabling it
+    CHAT_BURST_COALESCING = os.getenv("CHAT_BURST_COALESCING", "false").lower() == "true"
+    CHAT_BURST_WINDOW_SECONDS = float(os.getenv("CHAT_BURST_WINDOW_SECONDS", "0.25"))
+    CHAT_BURST_MAX_WAIT_SECONDS = float(os.getenv("CHAT_BURST_MAX_WAIT_SECONDS", "3.0"))
+    
+    # responses of state-changing game endpoints are replayed for a repeated Idempotency-Key within this TTL
+    # (kept in the session database with SESSION_STORE=sqlite; IDEMPOTENCY_MAX_ENTRIES bounds the in-memory store)
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600"))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+    
+    # USD per 1M tokens: (input, cached input, output); used for the per-route cost report
+    MODEL_PRICES = {
+        "gpt-4.1": (2.00, 0.50, 8.00),
+        "gpt-4.1-mini": (0.40, 0.10, 1.60),
+        "gpt-4.1-nano": (0.10, 0.025, 0.40),
+        "gpt-4o": (2.50, 1.25, 10.00),
+        "gpt-4o-mini": (0.15, 0.075, 0.60),
+        "gpt-image-1": (5.00, 1.25, 40.00),
+    }
+    
+    # prompt token budgets (static prefix and current message are always kept; the rest is filled by priority)
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+    # provider-side prompt caching only applies to prompts of at least this many tokens
+    PROMPT_CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+    # per-model overrides, e.g. "gpt-4.1:4000,gpt-4o-mini:2000"
+    PROMPT_TOKEN_BUDGETS = {
+        model.strip(): int(budget)
+        for model, budget in (
+            item.split(":", 1) for item in os.getenv("PROMPT_TOKEN_BUDGETS", "").split(",") if ":" in item
+        )
+    }
     
     # AWS S3 settings
     AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
@@ -20,10 +184,14 @@ class Config:
     # game settings
     GAME_DEBUG_MODE = os.getenv("GAME_DEBUG_MODE", "false").lower() == "true"
     GAME_LOG_LEVEL = os.getenv("GAME_LOG_LEVEL", "INFO")
+    # /admin endpoints require an X-Admin-Token header with this value; if unset they are served only in debug mode
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
     
     # server settings
     SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
     SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+    # process start -> listening time budget (seconds); exceeding it is logged as a warning
+    STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "2.0"))
     
     @classmethod
     def validate(cls):
@@ -82,4 +250,9 @@ class Config:
         print("   - Pinecone API key: https://app.pinecone.io/")
         print("")
         print("3. restart the server: python main.py")
-        print("=" * 50) 
\ No newline at end of file
+        print("=" * 50) 
+    
+    @classmethod
+    def get_prompt_token_budget(cls, model: str) -> int:
+        """token budget of one prompt for a model"""
+        return cls.PROMPT_TOKEN_BUDGETS.get(model, cls.PROMPT_TOKEN_BUDGET)
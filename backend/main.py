@@ -1,9 +1,26 @@
-from fastapi import FastAPI, HTTPException
+import time
+PROCESS_START = time.perf_counter()  # measured before the heavier imports below
+
+import asyncio
+import secrets
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 import uvicorn
 from services.game_manager import GameManager
+from utils.prompt_cache_stats import prompt_cache_stats
+from utils.structured_output import structured_output_stats
+from utils.model_router import model_router
+from utils.call_policy import call_policy
+from utils.rate_limiter import rate_limiter
+from utils.single_flight import single_flight, request_key
+from utils.idempotency import idempotency_store, IdempotencyKeyReused, StoredClientError
+from utils.session_store import SessionVersionConflict
 from config import Config
 
 # validate environment variables
@@ -15,7 +32,31 @@ except ValueError as e:
     Config.print_setup_instructions()
     exit(1)
 
-app = FastAPI(title="Personalized Adventure Game API", version="1.0.0")
+# game manager instance (for managing the game state)
+# services behind it are created lazily, so this does not touch the network
+game_manager = GameManager()
+startup_seconds: Optional[float] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """record start-to-listening time and warm up services in the background; stop background work on shutdown"""
+    global startup_seconds
+    
+    # warm-up runs off the event loop so the server starts accepting requests immediately
+    asyncio.get_running_loop().run_in_executor(None, game_manager.warm_up)
+    
+    # periodic TTL compaction of vectors from completed/idle games
+    game_manager.compactor.start()
+    
+    startup_seconds = time.perf_counter() - PROCESS_START
+    if startup_seconds > Config.STARTUP_BUDGET_SECONDS:
+        print(f"⚠️ startup took {startup_seconds:.2f}s (budget: {Config.STARTUP_BUDGET_SECONDS:.2f}s)")
+    else:
+        print(f"🚀 startup took {startup_seconds:.2f}s (budget: {Config.STARTUP_BUDGET_SECONDS:.2f}s)")
+    yield
+    game_manager.compactor.stop()
+
+app = FastAPI(title="Personalized Adventure Game API", version="1.0.0", lifespan=lifespan)
 
 # CORS settings (allow all origins) 
 app.add_middleware(
@@ -26,9 +67,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# game manager instance (for managing the game state)
-game_manager = GameManager()
-
 # request/response model (for the chat API)
 class ChatRequest(BaseModel):
     player_id: str
@@ -46,26 +84,50 @@ class NewGameResponse(BaseModel):
     player_id: str
     welcome_message: str
 
+def _idempotent(endpoint: str, idempotency_key: Optional[str], request_data: Any, handler):
+    """run a state-changing handler once per Idempotency-Key; repeats within the TTL get the stored response"""
+    if not idempotency_key:
+        return handler()
+    try:
+        # stored as JSON, so a retry that reaches another worker gets the same response
+        return idempotency_store.run(endpoint, idempotency_key, request_key(request_data), lambda: jsonable_encoder(handler()))
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except StoredClientError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
 @app.post("/game/new", response_model=NewGameResponse)
-async def create_new_game():
+async def create_new_game(idempotency_key: Optional[str] = Header(default=None)):
     """create a new game"""
+    return await run_in_threadpool(_idempotent, "new_game", idempotency_key, None, _create_new_game)
+
+def _create_new_game() -> NewGameResponse:
     try:
         player_id = game_manager.create_new_game()
-        game_state = game_manager.active_games[player_id]
         
-        # get the welcome message
-        welcome_message = game_state.conversation_history[0]["message"] if game_state.conversation_history else ""
+        # get the welcome message (read through the player's session, so it reflects the stored state)
+        welcome_message = game_manager.get_welcome_message(player_id) or ""
         
         return NewGameResponse(
             player_id=player_id,
             welcome_message=welcome_message
         )
+    except SessionVersionConflict as e:
+        # another worker changed this game meanwhile; the client retries
+        raise HTTPException(status_code=409, detail=f"game state conflict: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"game creation error: {str(e)}")
 
 @app.post("/game/chat", response_model=ChatResponse)
-async def chat_with_npc(request: ChatRequest):
+async def chat_with_npc(request: ChatRequest, idempotency_key: Optional[str] = Header(default=None)):
     """chat with NPC"""
+    # game handlers run in worker threads: they wait for the player's session (and the burst
+    # window) without blocking other players' requests
+    return await run_in_threadpool(
+        _idempotent, "chat", idempotency_key, [request.player_id, request.message], lambda: _chat_with_npc(request)
+    )
+
+def _chat_with_npc(request: ChatRequest) -> ChatResponse:
     try:
         result = game_manager.process_player_message(request.player_id, request.message)
         
@@ -80,6 +142,9 @@ async def chat_with_npc(request: ChatRequest):
             current_stage=result["current_stage"],
             player_info=result["player_info"]
         )
+    except SessionVersionConflict as e:
+        # another worker changed this game meanwhile; the client retries
+        raise HTTPException(status_code=409, detail=f"game state conflict: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"chat processing error: {str(e)}")
 
@@ -93,8 +158,11 @@ async def get_generated_maps():
         raise HTTPException(status_code=500, detail=f"error getting generated maps: {str(e)}")
 
 @app.post("/game/next-stage/{player_id}")
-async def advance_to_next_stage(player_id: str):
+async def advance_to_next_stage(player_id: str, idempotency_key: Optional[str] = Header(default=None)):
     """advance to the next stage"""
+    return await run_in_threadpool(_idempotent, "next_stage", idempotency_key, player_id, lambda: _advance_to_next_stage(player_id))
+
+def _advance_to_next_stage(player_id: str) -> Dict[str, Any]:
     try:
         result = game_manager.advance_to_next_stage(player_id)
         
@@ -115,60 +183,170 @@ async def advance_to_next_stage(player_id: str):
             "player_info": result.get("player_info"),
             "stage_intro_message": result.get("stage_intro_message")
         }
+    except SessionVersionConflict as e:
+        # another worker changed this game meanwhile; the client retries
+        raise HTTPException(status_code=409, detail=f"game state conflict: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"stage progression error: {str(e)}")
 
 @app.post("/game/enemy-defeated/{player_id}")
-async def enemy_defeated(player_id: str):
+async def enemy_defeated(player_id: str, idempotency_key: Optional[str] = Header(default=None)):
     """API called when the enemy is defeated"""
+    return await run_in_threadpool(_idempotent, "enemy_defeated", idempotency_key, player_id, lambda: _enemy_defeated(player_id))
+
+def _enemy_defeated(player_id: str) -> Dict[str, Any]:
     try:
-        if player_id not in game_manager.active_games:
+        # update the enemy status and check if the stage is complete (in the player's session)
+        status = game_manager.mark_enemy_defeated(player_id)
+        if status is None:
             raise HTTPException(status_code=400, detail="game not found")
         
-        game_state = game_manager.active_games[player_id]
-        
-        # update the enemy status
-        game_state.monster_defeated = True
-        
-        print(f"✅ enemy defeated - Player: {player_id}, Stage: {game_state.current_stage.value}")
-        
-        # check if the stage is complete
-        is_stage_complete = game_manager.npc_service.stage_manager.is_stage_complete(game_state)
-        
         return {
             "message": "Enemy defeated!",
             "monster_defeated": True,
-            "stage_complete": is_stage_complete,
-            "current_stage": game_state.current_stage.value,
-            "can_advance": is_stage_complete
+            "stage_complete": status["stage_complete"],
+            "current_stage": status["current_stage"],
+            "can_advance": status["stage_complete"]
         }
+    except SessionVersionConflict as e:
+        # another worker changed this game meanwhile; the client retries
+        raise HTTPException(status_code=409, detail=f"game state conflict: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"enemy defeat processing error: {str(e)}")
 
 @app.post("/game/reset-enemy-status/{player_id}")
 async def reset_enemy_status(player_id: str):
     """reset the enemy status when a new stage starts"""
+    return await run_in_threadpool(_reset_enemy_status, player_id)
+
+def _reset_enemy_status(player_id: str) -> Dict[str, Any]:
     try:
-        if player_id not in game_manager.active_games:
+        current_stage = game_manager.reset_enemy_status(player_id)
+        if current_stage is None:
             raise HTTPException(status_code=400, detail="game not found")
         
-        game_state = game_manager.active_games[player_id]
-        game_state.monster_defeated = False
-        
-        print(f"🔄 enemy status initialization - Player: {player_id}, Stage: {game_state.current_stage.value}")
-        
         return {
             "message": "enemy status initialization completed",
             "monster_defeated": False,
-            "current_stage": game_state.current_stage.value
+            "current_stage": current_stage
         }
+    except SessionVersionConflict as e:
+        # another worker changed this game meanwhile; the client retries
+        raise HTTPException(status_code=409, detail=f"game state conflict: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"status initialization error: {str(e)}")
 
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """admin endpoints need X-Admin-Token = ADMIN_TOKEN; without a configured token only in debug mode"""
+    if Config.ADMIN_TOKEN:
+        if not x_admin_token or not secrets.compare_digest(x_admin_token, Config.ADMIN_TOKEN):
+            raise HTTPException(status_code=403, detail="invalid admin token")
+    elif not Config.GAME_DEBUG_MODE:
+        raise HTTPException(status_code=403, detail="admin endpoints are disabled (set ADMIN_TOKEN)")
+
+# operational stats; every route below is guarded by require_admin
+admin = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+@admin.get("/compaction")
+async def get_compaction_report():
+    """return the last vector compaction report and running totals"""
+    return {
+        "last_report": game_manager.compactor.last_report,
+        "totals": game_manager.compactor.totals
+    }
+
+@admin.get("/query-cache")
+async def get_query_cache_stats():
+    """return hit/miss statistics of the per-player vector query cache"""
+    return game_manager.npc_service.vector_store.query_cache.get_stats()
+
+@admin.get("/prompt-cache")
+async def get_prompt_cache_stats():
+    """return cached-token ratios per call site (from OpenAI usage data)"""
+    return prompt_cache_stats.get_stats()
+
+@admin.get("/extraction")
+async def get_extraction_stats():
+    """return hit rates of the rule-based extraction tier (LLM extraction calls skipped)"""
+    return game_manager.npc_service.info_collector.local_extractor.get_stats()
+
+@admin.get("/model-routes")
+async def get_model_route_stats():
+    """return calls, latency, tokens and cost per (call site, model) route"""
+    return model_router.get_stats()
+
+@admin.get("/rate-limits")
+async def get_rate_limit_stats():
+    """return per-model queue depth and bucket levels, and wait times per call site"""
+    return rate_limiter.get_stats()
+
+@admin.get("/sessions")
+async def get_session_stats():
+    """return active games and session lock contention"""
+    return game_manager.sessions.get_stats()
+
+@admin.get("/chat-bursts")
+async def get_chat_burst_stats():
+    """return how many chat messages were merged into shared turns"""
+    return game_manager.burst_coalescer.get_stats()
+
+@admin.get("/idempotency")
+async def get_idempotency_stats():
+    """return executions, replays and key conflicts of idempotent game requests"""
+    return idempotency_store.get_stats()
+
+@admin.get("/single-flight")
+async def get_single_flight_stats():
+    """return executions and coalesced duplicates of single-flight calls, per namespace"""
+    return single_flight.get_stats()
+
+@admin.get("/call-policy")
+async def get_call_policy_stats():
+    """return retry, deadline and hedging metrics of outbound model calls, per call site"""
+    return call_policy.get_stats()
+
+@admin.get("/structured-output")
+async def get_structured_output_stats():
+    """return parse-failure and retry rates of schema-constrained calls, per call site"""
+    return structured_output_stats.get_stats()
+
+@admin.get("/question-cache")
+async def get_question_cache_stats():
+    """return hit/miss statistics of the cached info-collection questions"""
+    return game_manager.npc_service.info_collector.question_cache.get_stats()
+
+@admin.get("/triage")
+async def get_triage_stats():
+    """return message triage labels and the extraction/retrieval calls they avoided"""
+    return game_manager.npc_service.message_triage.get_stats()
+
+app.include_router(admin)
+
 @app.get("/health")
 async def health_check():
     """check the server status"""
     return {"status": "healthy", "service": "Personalized Adventure Game API"}
 
+@app.get("/health/live")
+async def liveness_check():
+    """liveness: the process is up and serving requests"""
+    uptime_seconds = time.perf_counter() - PROCESS_START
+    return {"status": "alive", "startup_seconds": startup_seconds, "uptime_seconds": uptime_seconds}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """readiness: warm-up finished and all lazy services are initialized"""
+    readiness = game_manager.get_readiness()
+    status_code = 200 if readiness["ready"] else 503
+    return JSONResponse(status_code=status_code, content=readiness)
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    workers = Config.API_WORKERS
+    if workers > 1 and Config.SESSION_STORE == "memory":
+        print("⚠️ API_WORKERS > 1 needs the shared session and idempotency store (SESSION_STORE=sqlite); starting a single worker")
+        workers = 1
+    if workers > 1:
+        # each worker process imports this module; game states and idempotency records are shared through SQLite
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,67 @@
+import re
+from typing import Dict, List, Optional
+from utils.token_counter import count_tokens
+from config import Config
+
+class ContextAssembler:
+    """collect candidate prompt context from several sources and fit it into a token budget.
+
+    candidates are deduplicated by normalized text, counted with a local tokenizer and
+    admitted by priority (lower number first) until the model's budget is used up.
+    required candidates (static prefix, current message) are always admitted.
+    """
+
+    def __init__(self, model: str, budget: Optional[int] = None):
+        self.model = model
+        self.budget = budget or Config.get_prompt_token_budget(model)
+        self._candidates: List[Dict] = []
+
+    def add(self, section: str, text: str, source: Optional[str] = None,
+            priority: int = 0, required: bool = False):
+        """add a candidate text to a section (source defaults to the section name)"""
+        if not text or not text.strip():
+            return
+        self._candidates.append({
+            "section": section,
+            "source": source or section,
+            "text": text,
+            "priority": priority,
+            "required": required,
+            "order": len(self._candidates)
+        })
+
+    def assemble(self, call_site: str = "prompt") -> Dict[str, List[str]]:
+        """return section -> admitted texts (in the order they were added) and log the breakdown"""
+        seen = set()
+        admitted = []
+        breakdown: Dict[str, int] = {}
+        dropped = {"duplicate": 0, "over_budget": 0}
+        used = 0
+
+        # required first, then by priority; ties keep insertion order
+        for candidate in sorted(self._candidates, key=lambda c: (not c["required"], c["priority"], c["order"])):
+            key = self._normalize(candidate["text"])
+            if key in seen:
+                dropped["duplicate"] += 1
+                continue
+
+            tokens = count_tokens(candidate["text"], self.model)
+            if not candidate["required"] and used + tokens > self.budget:
+                dropped["over_budget"] += 1
+                continue
+
+            seen.add(key)
+            admitted.append(candidate)
+            used += tokens
+            breakdown[candidate["source"]] = breakdown.get(candidate["source"], 0) + tokens
+
+        sections: Dict[str, List[str]] = {}
+        for candidate in sorted(admitted, key=lambda c: c["order"]):
+            sections.setdefault(candidate["section"], []).append(candidate["text"])
+
+        print(f"🧮 prompt tokens [{call_site}] {used}/{self.budget} ({self.model}): {breakdown}"
+              f" dropped={dropped}")
+        return sections
+
+    def _normalize(self, text: str) -> str:
+        return re.sub(r"\s+", " ", text).strip().lower()
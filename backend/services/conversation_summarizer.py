@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import threading
+from utils.game_state import GameState
+from utils.prompt_cache_stats import prompt_cache_stats
+from utils.model_router import model_router
+from utils.player_sessions import player_sessions
+from config import Config
+
+class ConversationSummarizer:
+    """fold older conversation turns into per-stage rolling summaries.
+
+    runs in a background worker with a cheap model, so the chat request never waits for it.
+    prompts then use the summary plus a short window of recent raw turns.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summarizer")
+        self._pending = set()  # player ids with a summarization job in flight
+        self._lock = threading.Lock()
+
+    def maybe_schedule(self, game_state: GameState):
+        """schedule summarization when enough turns fell out of the recent window"""
+        fold_upto = len(game_state.conversation_history) - Config.CONVERSATION_RECENT_WINDOW
+        if fold_upto - game_state.summarized_upto < Config.SUMMARY_BATCH_TURNS:
+            return
+
+        player_id = game_state.player_id
+        with self._lock:
+            if player_id in self._pending:
+                return
+            self._pending.add(player_id)
+
+        self._executor.submit(self._run, game_state, fold_upto)
+
+    def _run(self, game_state: GameState, fold_upto: int):
+        try:
+            self.summarize(game_state, fold_upto)
+        except Exception as e:
+            print(f"⚠️ conversation summarization failed: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(game_state.player_id)
+
+    def summarize(self, game_state: GameState, fold_upto: int):
+        """fold conversation_history[summarized_upto:fold_upto] into the stage summaries"""
+        turns = game_state.conversation_history[game_state.summarized_upto:fold_upto]
+
+        # group turns by the stage they were said in
+        turns_by_stage: Dict[int, List[Dict[str, str]]] = {}
+        for turn in turns:
+            stage = int(turn.get("stage", game_state.current_stage.value))
+            turns_by_stage.setdefault(stage, []).append(turn)
+
+        # model calls run outside the player's session; the results are applied inside it
+        summaries = {
+            stage: self._summarize_turns(game_state.stage_summaries.get(stage, ""), stage_turns)
+            for stage, stage_turns in turns_by_stage.items()
+        }
+        with player_sessions.session(game_state.player_id) as current_state:
+            if current_state is None:
+                return
+            current_state.stage_summaries.update(summaries)
+            current_state.summarized_upto = max(current_state.summarized_upto, fold_upto)
+        print(f"📝 conversation summarized: player={game_state.player_id}, turns folded={len(turns)}")
+
+    def _summarize_turns(self, previous_summary: str, turns: List[Dict[str, str]]) -> str:
+        """update a running summary with new turns using the cheap model"""
+        conversation = "\n".join(f"{turn['speaker']}: {turn['message']}" for turn in turns)
+
+        response = model_router.complete(
+            "summarizer",
+            messages=[
+                {"role": "system", "content": "you maintain a running summary of a conversation between a game NPC and a player. keep every concrete fact the player shared (names, places, people, events, feelings) and the story beats so far. write at most 5 short sentences."},
+                {"role": "user", "content": f"current summary:\n{previous_summary or 'none'}\n\nnew turns:\n{conversation}\n\nreturn the updated summary only."}
+            ],
+            max_tokens=200,
+            temperature=0.2
+        )
+
+        prompt_cache_stats.record("summarizer", response.usage)
+        return response.choices[0].message.content.strip()
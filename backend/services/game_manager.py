@@ -1,7 +1,13 @@
 from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
 import uuid
 from utils.game_state import GameState, Stage
 from services.npc_service import NPCService
+from vector_db.compactor import VectorCompactor
+from config import Config
+from utils.single_flight import single_flight, request_key
+from utils.burst_coalescer import BurstCoalescer, ChatBurst
+from utils.player_sessions import player_sessions
 import logging
 
 # set logger
@@ -11,7 +17,46 @@ logger = logging.getLogger(__name__)
 class GameManager:
     def __init__(self):
         self.npc_service = NPCService()
-        self.active_games: Dict[str, GameState] = {}
+        # per-player sessions: all mutations of a player's state run under that player's lock
+        self.sessions = player_sessions
+        self.active_games: Dict[str, GameState] = self.sessions.games  # read-only view, written via sessions.put
+        self.warm_up_completed = False
+        
+        # expires vectors of completed/idle games in the background (started by the server)
+        self.compactor = VectorCompactor(lambda: self.npc_service.vector_store)
+        
+        # player info extraction that does not gate stage progress runs after the reply
+        self._extraction_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="extraction")
+        
+        # rapid consecutive messages of a player are merged into one turn
+        self.burst_coalescer = BurstCoalescer()
+    
+    def warm_up(self) -> Dict[str, Any]:
+        """initialize lazy services (clients, vector index, map recommender) ahead of the first request"""
+        status = {}
+        for name, service in self.npc_service.get_lazy_services().items():
+            try:
+                service.warm_up()
+                status[name] = {"ready": True, "init_seconds": service.init_seconds}
+            except Exception as e:
+                logger.error(f"❌ warm-up failed for {name}: {e}")
+                status[name] = {"ready": False, "error": str(e)}
+        
+        self.warm_up_completed = True
+        logger.info(f"✅ warm-up completed: {status}")
+        return status
+    
+    def get_readiness(self) -> Dict[str, Any]:
+        """return readiness of the lazily initialized services"""
+        services = {
+            name: {"ready": service.ready, "error": service.error}
+            for name, service in self.npc_service.get_lazy_services().items()
+        }
+        return {
+            "ready": self.warm_up_completed and all(s["ready"] for s in services.values()),
+            "warm_up_completed": self.warm_up_completed,
+            "services": services
+        }
     
     def create_new_game(self, player_id: Optional[str] = None) -> str:
         """create new game"""
@@ -20,7 +65,6 @@ class GameManager:
         
         game_state = GameState()
         game_state.player_id = player_id  # add player_id
-        self.active_games[player_id] = game_state
         
         # reset used_ai_maps (new game start)
         self.npc_service.map_recommender.used_ai_maps.clear()
@@ -34,6 +78,7 @@ class GameManager:
         # initial NPC welcome message
         welcome_message = self._generate_welcome_message()
         game_state.add_conversation("npc", welcome_message)
+        self.sessions.put(player_id, game_state)
         
         # save initial state to vector DB
         initial_context = {
@@ -49,24 +94,68 @@ class GameManager:
         return player_id
     
     def process_player_message(self, player_id: str, message: str) -> Dict[str, Any]:
-        """process player message and return response"""
-        
+        """process player message and return response (a duplicate of a message still being processed
+        waits for and returns the same response instead of running the turn twice)"""
+        return single_flight.run("chat", request_key(player_id, message), lambda: self._coalesce_message(player_id, message))
+    
+    def _coalesce_message(self, player_id: str, message: str) -> Dict[str, Any]:
+        if not Config.CHAT_BURST_COALESCING:
+            with self.sessions.session(player_id):
+                return self._process_player_message(player_id, message)
+        # a burst of messages sent within the debounce window is answered by one turn
+        return self.burst_coalescer.submit(player_id, message, self._process_burst)
+    
+    def _process_burst(self, burst: ChatBurst) -> Dict[str, Any]:
+        with self.sessions.session(burst.player_id):
+            burst.start()
+            return self._process_player_message(burst.player_id, burst.message, burst)
+    
+    def _process_player_message(self, player_id: str, message: str, burst: Optional[ChatBurst] = None) -> Dict[str, Any]:
         if player_id not in self.active_games:
             return {"error": "game not found. please start a new game."}
         
         game_state = self.active_games[player_id]
+        # messages of a superseded turn were already extracted; only the new ones are
+        extraction_message = burst.unextracted_message if burst else message
         
         logger.info(f"process player message: player_id={player_id}, message='{message[:50]}...'")
         
-        # extract player info (all stages)
-        self._extract_and_update_player_info(message, game_state)
+        # cheap local triage: chit-chat ("ok") and commands ("let's go") need no extraction or retrieval,
+        # except that a short reply to a pending info question ("no", "fine") is still extracted
+        info_pending = self.npc_service.stage_manager.info_question_pending(game_state)
+        triage = self.npc_service.message_triage.classify(message, info_pending)
+        logger.info(f"message triage: {triage['label']}")
+        
+        structured_turn = None
+        if Config.SINGLE_CALL_MODE:
+            if burst:
+                burst.commit()
+            # one structured call returns both the info delta and the reply (one model round trip less)
+            structured_turn = self.npc_service.generate_structured_turn(message, game_state, player_id, triage)
+            self._apply_extracted_info(structured_turn["player_info"], game_state)
+        elif triage["needs_extraction"] and extraction_message and self.npc_service.stage_manager.extraction_gates_progress(game_state.current_stage):
+            # extract player info before the reply (stage completion depends on it)
+            self._extract_and_update_player_info(extraction_message, game_state)
+        elif triage["needs_extraction"] and extraction_message:
+            # stage completion does not depend on it: extract after the reply, off the critical path
+            self._extraction_executor.submit(self._extract_in_background, player_id, extraction_message, game_state)
+        else:
+            self.npc_service.message_triage.record_avoided("extraction")
+        
+        if burst and not Config.SINGLE_CALL_MODE:
+            burst.mark_extracted()
+            # stop here if the player sent another message meanwhile; the merged burst replies instead
+            burst.commit()
         
         # check stage progress (after info extraction)
         stage_progress = self._check_stage_progress(game_state, message, player_id)
         
         # generate NPC response (only if stage transition is not pending)
         if not stage_progress.get("stage_completed", False) and not stage_progress.get("stage_transition_pending", False):
-            npc_response = self.npc_service.generate_response(message, game_state, player_id)
+            if structured_turn is not None:
+                npc_response = self._finish_structured_turn(structured_turn, game_state, player_id)
+            else:
+                npc_response = self.npc_service.generate_response(message, game_state, player_id, triage)
         else:
             npc_response = ""
             
@@ -101,6 +190,9 @@ class GameManager:
         self.npc_service.vector_store.add_conversation(player_id, npc_conversation_data)
         logger.info(f"NPC conversation saved: {npc_conversation_data}")
         
+        # fold older turns into the rolling summary (runs in the background)
+        self.npc_service.conversation_summarizer.maybe_schedule(game_state)
+        
         # if stage progress is completed and stage intro message is present, add stage intro message to NPC response
         if stage_progress.get("stage_completed", False) and stage_progress.get("stage_intro_message"):
             # add stage intro message to NPC response
@@ -122,6 +214,17 @@ class GameManager:
             "player_info": game_state.player_info.to_dict()
         }
     
+    def _finish_structured_turn(self, structured_turn: Dict[str, Any], game_state: GameState, player_id: str) -> str:
+        """final reply of a single-call turn: the reply, plus the follow-up question if info is still missing"""
+        npc_response = structured_turn["reply"]
+        
+        # missing info is checked after the delta was applied, so an answered question is not asked again
+        if structured_turn.get("next_question") and self.npc_service.stage_manager.get_missing_info_for_stage(game_state):
+            npc_response = f"{npc_response}\n\n{structured_turn['next_question']}"
+        
+        self.npc_service.record_npc_reply(game_state, player_id, npc_response)
+        return npc_response
+    
     def _generate_welcome_message(self) -> str:
         """generate welcome message"""
         return """
@@ -148,7 +251,21 @@ class GameManager:
                 print(f"   {key}: {value}")
         
         extracted_info = self.npc_service.extract_player_info(message, game_state)
-        
+        self._apply_extracted_info(extracted_info, game_state)
+    
+    def _extract_in_background(self, player_id: str, message: str, game_state: GameState):
+        """extract player info without holding the session, then merge it under the session lock"""
+        try:
+            extracted_info = self.npc_service.extract_player_info(message, game_state)
+            with self.sessions.session(player_id) as current_state:
+                # merge into the latest state (another worker may have stored a newer version meanwhile)
+                if current_state is not None:
+                    self._apply_extracted_info(extracted_info, current_state)
+        except Exception as e:
+            logger.error(f"❌ background info extraction failed: {e}")
+    
+    def _apply_extracted_info(self, extracted_info: Dict[str, Any], game_state: GameState):
+        """merge extracted player info into the game state"""
         if extracted_info:
             print(f"✅✅✅ info extraction success:")
             for key, value in extracted_info.items():
@@ -292,11 +409,19 @@ class GameManager:
     
     def get_game_status(self, player_id: str) -> Optional[Dict[str, Any]]:
         """return game status"""
-        if player_id not in self.active_games:
-            return None
-        
-        game_state = self.active_games[player_id]
-        
+        with self.sessions.session(player_id, readonly=True) as game_state:
+            if game_state is None:
+                return None
+            return self._game_status(game_state)
+    
+    def get_welcome_message(self, player_id: str) -> Optional[str]:
+        """return the first NPC message of a game (None if there is no such game)"""
+        with self.sessions.session(player_id, readonly=True) as game_state:
+            if game_state is None:
+                return None
+            return game_state.conversation_history[0]["message"] if game_state.conversation_history else ""
+    
+    def _game_status(self, game_state: GameState) -> Dict[str, Any]:
         return {
             "current_stage": game_state.current_stage.value,
             "stage_name": game_state.current_stage.name,
@@ -308,24 +433,23 @@ class GameManager:
         }
     
     def save_game(self, player_id: str):
-        """save game state to vector DB"""
-        if player_id in self.active_games:
-            game_state = self.active_games[player_id]
-            
-            # save game state to vector DB
-            self.npc_service.vector_store.add_player_context(player_id, {
-                "game_state": game_state.dict(),
-                "last_saved": True
-            })
+        """save game state (blob kept in the local store, a compact marker vector goes to vector DB)"""
+        with self.sessions.session(player_id, readonly=True) as game_state:
+            if game_state is None:
+                return
+            state_json = game_state.json()
+            stage = game_state.current_stage.value
+        
+        self.npc_service.vector_store.save_game_state(player_id, state_json, stage)
     
     def load_game(self, player_id: str) -> bool:
         """load saved game"""
         try:
-            # search game state in vector DB
-            history = self.npc_service.vector_store.get_player_history(player_id, limit=1)
+            # the full state is fetched lazily from the local store, not from vector metadata
+            saved_state = self.npc_service.vector_store.load_game_state(player_id)
             
-            if history:
-                # restore game state (more secure parsing needed in actual implementation)
+            if saved_state:
+                self.sessions.put(player_id, GameState.parse_raw(saved_state))
                 return True
             
             return False
@@ -335,8 +459,36 @@ class GameManager:
             return False
     
     def advance_to_next_stage(self, player_id: str) -> Dict[str, Any]:
-        """advance to next stage. check each stage condition."""
-        
+        """advance to next stage. check each stage condition. concurrent requests for the same player
+        share one advance, so a double click cannot skip a stage."""
+        return single_flight.run("next_stage", request_key(player_id), lambda: self._locked_advance(player_id))
+    
+    def _locked_advance(self, player_id: str) -> Dict[str, Any]:
+        with self.sessions.session(player_id):
+            return self._advance_to_next_stage(player_id)
+    
+    def mark_enemy_defeated(self, player_id: str) -> Optional[Dict[str, Any]]:
+        """record the stage enemy as defeated; returns the stage status (None if there is no such game)"""
+        with self.sessions.session(player_id) as game_state:
+            if game_state is None:
+                return None
+            game_state.monster_defeated = True
+            print(f"✅ enemy defeated - Player: {player_id}, Stage: {game_state.current_stage.value}")
+            return {
+                "current_stage": game_state.current_stage.value,
+                "stage_complete": self.npc_service.stage_manager.is_stage_complete(game_state)
+            }
+    
+    def reset_enemy_status(self, player_id: str) -> Optional[int]:
+        """reset the enemy status when a new stage starts; returns the current stage (None if there is no such game)"""
+        with self.sessions.session(player_id) as game_state:
+            if game_state is None:
+                return None
+            game_state.monster_defeated = False
+            print(f"🔄 enemy status initialization - Player: {player_id}, Stage: {game_state.current_stage.value}")
+            return game_state.current_stage.value
+    
+    def _advance_to_next_stage(self, player_id: str) -> Dict[str, Any]:
         if player_id not in self.active_games:
             return {"error": "game not found. please start a new game."}
         
@@ -437,6 +589,13 @@ class GameManager:
                 "type": "stage_completion"
             })
             
+            # keep a final snapshot (used for the compacted summary) and start the completed TTL
+            try:
+                self.save_game(player_id)
+                self.npc_service.vector_store.mark_player_completed(player_id)
+            except Exception as e:
+                logger.error(f"❌ failed to mark game completed: {e}")
+            
             print("🎉 boss stage completed: game end condition met")
             
             return {
@@ -1,22 +1,25 @@
-from typing import Dict, List, Any
-from utils.game_state import GameState, PlayerInfo
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
+from typing import Dict, List, Any, Optional
+from utils.game_state import GameState, PlayerInfo, Stage
+from utils.prompt_cache_stats import prompt_cache_stats
+from utils.model_router import model_router
+from utils.structured_output import extraction_fields, player_info_schema, validate_player_info, structured_output_stats
+from utils.single_flight import single_flight, request_key
+from config import Config
+from services.local_extractor import LocalInfoExtractor
+from services.question_cache import QuestionCache
 import json
 
-load_dotenv()
-
 class InfoCollector:
     """manage player info collection"""
     
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # rule-based tier in front of the LLM extraction call
+        self.local_extractor = LocalInfoExtractor()
+        # slot-filled question variants in front of the LLM question call
+        self.question_cache = QuestionCache()
     
-    def extract_player_info(self, player_message: str, game_state: GameState) -> Dict[str, Any]:
-        """extract information from player message. extract accurate information for each stage."""
-        
-        current_stage = game_state.current_stage
+    def get_extraction_instructions(self, current_stage: Stage) -> str:
+        """stage-specific extraction instructions (shared by the extraction call and the single-call mode)"""
         
         # system prompt for each stage - to extract more accurate information
         if current_stage.value == 1:  # tutorial
@@ -101,52 +104,102 @@ class InfoCollector:
             - "I want to try something new"
             """
         
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": player_message}
-                ],
-                max_tokens=300,
-                temperature=0.1
-            )
+        return system_prompt
+    
+    def extract_player_info(self, player_message: str, game_state: GameState) -> Dict[str, Any]:
+        """extract information from player message. extract accurate information for each stage."""
+        
+        current_stage = game_state.current_stage
+        
+        # obvious facts ("I'm 24", "I live in Busan") are extracted locally without an LLM call
+        local_result = self.local_extractor.extract(player_message, game_state)
+        if local_result["skip_llm"]:
+            print(f"⚡ local extraction (stage {current_stage.value}): {local_result['info']} confidence={local_result['confidence']}")
+            return local_result["info"]
+        
+        # identical messages in the same stage extracted concurrently (retries, double sends) share one call
+        llm_info = single_flight.run("info_extraction", request_key(current_stage.value, player_message),
+                                     lambda: self._extract_with_llm(player_message, current_stage))
+        if llm_info is None:
+            return local_result["info"]
+        
+        # confident local facts fill the fields the LLM left out
+        extracted_info = dict(llm_info)
+        for key, value in local_result["info"].items():
+            extracted_info.setdefault(key, value)
+        
+        print(f"🔍🔍🔍 extracted info (stage {current_stage.value}):")
+        print(f"   original message: {player_message}")
+        print(f"   extracted info: {extracted_info}")
+        
+        return extracted_info
+    
+    def _extract_with_llm(self, player_message: str, current_stage: Stage) -> Optional[Dict[str, Any]]:
+        """schema-constrained extraction call with retries on unparseable output (None on failure)"""
+        system_prompt = self.get_extraction_instructions(current_stage)
+        
+        # schema-constrained output: every field of the stage present, null when not mentioned
+        fields = extraction_fields(current_stage)
+        response_format = {
+            "type": "json_schema",
+            "json_schema": {"name": "player_info_delta", "strict": True, "schema": player_info_schema(fields)}
+        }
+        
+        structured_output_stats.record("info_extraction", "requests")
+        for attempt in range(Config.EXTRACTION_MAX_RETRIES + 1):
+            if attempt:
+                structured_output_stats.record("info_extraction", "retries")
+            structured_output_stats.record("info_extraction", "attempts")
             
-            # parse JSON
-            response_content = response.choices[0].message.content.strip()
-            
-            # extract JSON block
-            if "```json" in response_content:
-                start = response_content.find("```json") + 7
-                end = response_content.find("```", start)
-                response_content = response_content[start:end].strip()
-            elif "```" in response_content:
-                start = response_content.find("```") + 3
-                end = response_content.find("```", start)
-                response_content = response_content[start:end].strip()
-
-            extracted_info = json.loads(response_content)
+            try:
+                response = model_router.complete(
+                    "info_extraction",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": player_message}
+                    ],
+                    response_format=response_format,
+                    max_tokens=300,
+                    temperature=0.1
+                )
+                prompt_cache_stats.record("info_extraction", response.usage)
+            except Exception as e:
+                print(f"❌❌❌ error extracting info:")
+                print(f"   error message: {e}")
+                print(f"   original message: {player_message}")
+                break
             
-            # remove null values
-            extracted_info = {k: v for k, v in extracted_info.items() if v is not None and v != ""}
+            try:
+                message = response.choices[0].message
+                if getattr(message, "refusal", None):
+                    raise ValueError(f"extraction refused: {message.refusal}")
+                extracted_info, invalid_fields = validate_player_info(json.loads(message.content), fields)
+            except (TypeError, ValueError) as e:
+                # json.JSONDecodeError is a ValueError; truncated or refused output is retried
+                structured_output_stats.record("info_extraction", "parse_failures")
+                print(f"⚠️ extraction output could not be parsed (attempt {attempt + 1}): {e}")
+                continue
             
-            print(f"🔍🔍🔍 extracted info (stage {current_stage.value}):")
-            print(f"   original message: {player_message}")
-            print(f"   extracted info: {extracted_info}")
+            if invalid_fields:
+                structured_output_stats.record("info_extraction", "invalid_fields", len(invalid_fields))
+                print(f"⚠️ dropped invalid extracted fields: {invalid_fields}")
             
             return extracted_info
-            
-        except Exception as e:
-            print(f"❌❌❌ error extracting info:")
-            print(f"   error message: {e}")
-            print(f"   original message: {player_message}")
-            return {}
+        
+        structured_output_stats.record("info_extraction", "failures")
+        return None
     
     def generate_info_collection_question(self, game_state: GameState, missing_info: List[str]) -> str:
         """generate a natural question about the missing information"""
         current_stage = game_state.current_stage
         player_info = game_state.player_info
         
+        # cached variant for this question shape (LLM only on a miss or a sampled refresh)
+        cached_question = self.question_cache.get(game_state, missing_info)
+        if cached_question:
+            print(f"cached info collection question: {cached_question}")
+            return cached_question
+        
         # emphasize personality_traits and likes if they are missing
         first_missing = missing_info[0]
         
@@ -180,19 +233,21 @@ requirements:
 9. naturally explain that more information is needed if the number condition is not met
 """
         
+        messages = [
+            {"role": "system", "content": "you are a personalized adventure game NPC. you naturally talk with the player and collect the necessary information. to complete the tutorial, all required information is needed."},
+            {"role": "user", "content": context}
+        ]
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "you are a personalized adventure game NPC. you naturally talk with the player and collect the necessary information. to complete the tutorial, all required information is needed."},
-                    {"role": "user", "content": context}
-                ],
-                max_tokens=150,
-                temperature=0.8
+            response = single_flight.run(
+                "info_question",
+                request_key(messages),
+                lambda: model_router.complete("info_question", messages=messages, max_tokens=150, temperature=0.8)
             )
             
+            prompt_cache_stats.record("info_question", response.usage)
             question = response.choices[0].message.content.strip()
             print(f"AI info collection question: {question}")
+            self.question_cache.learn(game_state, missing_info, question)
             return question
             
         except Exception as e:
@@ -0,0 +1,213 @@
+import re
+import threading
+from typing import Any, Dict, List, Tuple
+from utils.game_state import GameState, Stage
+from config import Config
+
+# gazetteers for the fields that have a small closed vocabulary
+KNOWN_LOCATIONS = {
+    "seoul", "busan", "incheon", "daegu", "daejeon", "gwangju", "ulsan", "suwon", "sejong", "jeju",
+    "seongnam", "goyang", "yongin", "changwon", "cheongju", "jeonju", "pohang", "gangneung", "gyeonggi",
+    "서울", "부산", "인천", "대구", "대전", "광주", "울산", "수원", "세종", "제주",
+    "korea", "south korea", "japan", "tokyo", "osaka", "china", "beijing", "shanghai", "taiwan", "taipei",
+    "hong kong", "singapore", "vietnam", "hanoi", "thailand", "bangkok", "india", "mumbai", "delhi",
+    "usa", "america", "united states", "new york", "los angeles", "san francisco", "seattle", "chicago",
+    "boston", "canada", "toronto", "vancouver", "uk", "england", "london", "france", "paris", "germany",
+    "berlin", "spain", "madrid", "italy", "rome", "australia", "sydney", "melbourne", "brazil", "mexico"
+}
+
+OCCUPATIONS = {
+    "student", "high school student", "middle school student", "college student", "university student",
+    "graduate student", "teacher", "professor", "developer", "software developer", "web developer",
+    "engineer", "software engineer", "programmer", "designer", "nurse", "doctor", "artist", "writer",
+    "musician", "chef", "cook", "lawyer", "accountant", "researcher", "scientist", "data scientist",
+    "manager", "salesperson", "driver", "farmer", "police officer", "firefighter", "soldier", "pilot",
+    "photographer", "freelancer", "barista", "cashier", "consultant", "architect", "pharmacist", "dentist",
+    "office worker", "civil servant", "homemaker", "youtuber", "streamer", "marketer", "translator",
+    "illustrator", "animator", "game developer", "intern", "tutor", "retiree"
+}
+
+# words after "I'm", "call me" or "my name is" that are not names
+NOT_NAMES = {
+    "korean", "american", "japanese", "chinese", "british", "canadian", "french", "german", "vietnamese",
+    "here", "back", "fine", "good", "okay", "ok", "ready", "sorry", "not", "so", "very", "really", "just",
+    "a", "an", "the", "from", "in", "at", "living", "working", "studying", "currently",
+    "happy", "glad", "sad", "tired", "bored", "hungry", "busy", "excited", "nervous", "scared", "lost",
+    "confused", "curious", "new", "done", "great", "alright", "sure", "maybe", "kidding", "joking",
+    "whatever", "anything", "anyone", "nobody", "someone", "something", "nothing", "later", "sometime"
+}
+
+# words that carry no information worth an extraction call
+FILLER_WORDS = {
+    "a", "an", "the", "i", "im", "i'm", "me", "my", "am", "is", "are", "and", "or", "but", "so", "to", "of",
+    "in", "at", "from", "as", "it", "its", "this", "that", "hi", "hello", "hey", "yes", "yeah", "yep", "no",
+    "ok", "okay", "nice", "meet", "you", "too", "well", "um", "uh", "oh", "currently", "now", "right",
+    "years", "year", "old", "name", "called", "call", "live", "living", "work", "working", "job", "based",
+    "thanks", "thank", "sure", "here", "there"
+}
+
+_END = r"(?=\s+(?:and|but|where|with|since|because|so|at|for)\b|\s*[.!?;]|\s*$)"
+
+# a second name word must be capitalized even though the rest of the pattern ignores case
+NAME_PATTERNS = [
+    (re.compile(r"\bmy name(?: is|'s)\s+([A-Za-z가-힣][\w'-]*(?:\s+(?-i:[A-Z][\w'-]*))?)", re.I), 0.95),
+    (re.compile(r"\b(?:call me|name's|i'm called|i am called)\s+([A-Za-z가-힣][\w'-]*)", re.I), 0.95),
+]
+IM_NAME_PATTERN = re.compile(r"\b(?:i'm|i am|im|this is)\s+([A-Za-z가-힣][\w'-]*)(?=\s*(?:[,.!?]|and\b|$))", re.I)
+
+AGE_PATTERNS = [
+    (re.compile(r"\b(\d{1,3})\s*(?:years? old|yrs? old|y/o|yo)\b", re.I), 0.95),
+    (re.compile(r"\b(?:my age is|age is|aged|age:?)\s*(\d{1,3})\b", re.I), 0.95),
+    (re.compile(r"\b(?:i'm|i am|im)\s+(\d{1,3})(?=\s*(?:[,.!?]|and\b|$))", re.I), 0.9),
+    (re.compile(r"(?:^|,)\s*(\d{2})(?=\s*(?:[,.!?]|$))"), 0.8),
+]
+
+LOCATION_PATTERN = re.compile(
+    r"\b(?:i live in|i'm living in|i am living in|i'm based in|i am based in|i'm from|i am from|im from|i live at|living in|based in|from)\s+"
+    r"((?:the\s+)?[A-Za-z가-힣][\w'-]*(?:\s+[A-Za-z가-힣][\w'-]*){0,2}(?:,\s*[A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)?)?)" + _END,
+    re.I
+)
+
+OCCUPATION_PATTERN = re.compile(
+    r"\b(?:i work as|i'm working as|i am working as|i'm an?|i am an?|im an?|my job is|i'm currently an?|i am currently an?)\s+"
+    r"(?:an?\s+)?([a-z][\w-]*(?:\s+[a-z][\w-]*){0,2})" + _END,
+    re.I
+)
+
+class LocalInfoExtractor:
+    """rule-based extraction tier for obvious tutorial facts (name, age, location, occupation).
+
+    regexes and small gazetteers give each fact a confidence score. the LLM extraction call is
+    skipped only when every fact is confident and nothing else in the message needs extracting.
+    """
+
+    FIELDS = ("name", "age", "location", "occupation")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {
+            "messages": 0,
+            "local_only": 0,
+            "llm_fallback": {"free_form_stage": 0, "low_confidence": 0, "residual_content": 0},
+            "field_hits": {field: 0 for field in self.FIELDS}
+        }
+
+    def extract(self, message: str, game_state: GameState) -> Dict[str, Any]:
+        """return {"info", "confidence", "skip_llm", "reason"} for a player message"""
+        info: Dict[str, Any] = {}
+        confidence: Dict[str, float] = {}
+        spans: List[Tuple[int, int]] = []
+
+        if Config.LOCAL_EXTRACTION_ENABLED and game_state.current_stage == Stage.TUTORIAL:
+            for field, (value, score, span) in self._match_fields(message).items():
+                info[field] = value
+                confidence[field] = score
+                spans.append(span)
+
+        # decide whether the LLM is still needed
+        if not Config.LOCAL_EXTRACTION_ENABLED or game_state.current_stage != Stage.TUTORIAL:
+            reason = "free_form_stage"
+        elif any(score < Config.LOCAL_EXTRACTION_MIN_CONFIDENCE for score in confidence.values()):
+            reason = "low_confidence"
+        elif self._residual_words(message, spans):
+            reason = "residual_content"
+        else:
+            reason = "local"
+
+        confident_info = {
+            field: value for field, value in info.items()
+            if confidence[field] >= Config.LOCAL_EXTRACTION_MIN_CONFIDENCE
+        }
+        self._record(reason, confident_info)
+        return {"info": confident_info, "confidence": confidence, "skip_llm": reason == "local", "reason": reason}
+
+    def _match_fields(self, message: str) -> Dict[str, Tuple[Any, float, Tuple[int, int]]]:
+        """field -> (value, confidence, matched span)"""
+        matches: Dict[str, Tuple[Any, float, Tuple[int, int]]] = {}
+
+        for pattern, score in AGE_PATTERNS:
+            match = pattern.search(message)
+            if match and 5 <= int(match.group(1)) <= 110:
+                matches["age"] = (int(match.group(1)), score, match.span())
+                break
+
+        location = LOCATION_PATTERN.search(message)
+        if location:
+            value = location.group(1).strip()
+            head = value.split(",")[0].strip().lower()
+            head = head[4:] if head.startswith("the ") else head
+            if head in KNOWN_LOCATIONS:
+                score = 0.95
+            elif value[:1].isupper() and head not in FILLER_WORDS:
+                score = 0.75
+            else:
+                score = 0.4
+            matches["location"] = (value, score, location.span())
+
+        occupation = OCCUPATION_PATTERN.search(message)
+        if occupation:
+            value = occupation.group(1).strip().lower()
+            if value in OCCUPATIONS:
+                matches["occupation"] = (value, 0.95, occupation.span())
+            elif value.split()[-1] in OCCUPATIONS:
+                matches["occupation"] = (value, 0.85, occupation.span())
+            else:
+                # "I'm a shy person" - a description, not a job; leave it to the LLM
+                matches["occupation"] = (value, 0.3, occupation.span())
+
+        for pattern, score in NAME_PATTERNS:
+            match = pattern.search(message)
+            if match:
+                # "my name is min so yeah" -> "min"; "call me maybe" is no name (left to the LLM)
+                name = self._name_words(match.group(1))
+                if name:
+                    matches["name"] = (name, score, (match.start(), match.start(1) + len(name)))
+                break
+        else:
+            match = IM_NAME_PATTERN.search(message)
+            if match and self._name_words(match.group(1)):
+                word = match.group(1)
+                taken = any(word.lower() in str(value[0]).lower() for value in matches.values())
+                if not taken:
+                    # "I'm Min." is a name; lowercase words after "I'm" are usually adjectives
+                    matches["name"] = (word, 0.85 if word[:1].isupper() else 0.4, match.span())
+
+        return matches
+
+    def _name_words(self, candidate: str) -> str:
+        """the leading words of a name candidate up to the first stop or filler word ("" if none)"""
+        words = []
+        for word in candidate.split():
+            if word.lower() in NOT_NAMES or word.lower() in FILLER_WORDS or word.isdigit():
+                break
+            words.append(word)
+        return " ".join(words)
+
+    def _residual_words(self, message: str, spans: List[Tuple[int, int]]) -> List[str]:
+        """content words outside the matched spans (anything else the LLM would have to extract)"""
+        remaining = message
+        for start, end in sorted(spans, reverse=True):
+            remaining = remaining[:start] + " " + remaining[end:]
+        words = re.findall(r"[\w'가-힣]+", remaining.lower())
+        return [word for word in words if word not in FILLER_WORDS and not word.isdigit()]
+
+    def _record(self, reason: str, confident_info: Dict[str, Any]):
+        with self._lock:
+            self.stats["messages"] += 1
+            if reason == "local":
+                self.stats["local_only"] += 1
+            else:
+                self.stats["llm_fallback"][reason] += 1
+            for field in confident_info:
+                self.stats["field_hits"][field] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            messages = self.stats["messages"]
+            return {
+                "messages": messages,
+                "local_only": self.stats["local_only"],
+                "local_hit_rate": round(self.stats["local_only"] / messages, 3) if messages else 0.0,
+                "llm_fallback": dict(self.stats["llm_fallback"]),
+                "field_hits": dict(self.stats["field_hits"])
+            }
@@ -1,4 +1,3 @@
-from openai import OpenAI
 import os
 import base64
 import json
@@ -8,25 +7,21 @@ import logging
 from datetime import datetime
 import uuid
 import re
-import boto3
 from config import Config
+from utils.clients import get_s3_client
+from utils.prompt_cache_stats import prompt_cache_stats
+from utils.model_router import model_router
+from utils.single_flight import single_flight, request_key
 
 logger = logging.getLogger(__name__)
 
 class MapGenerator:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.generated_maps_dir = "static/generated_maps"
         self.maps_metadata_file = "static/generated_maps/maps_metadata.json"
         self.used_styles = set()
         
-        # AWS S3 client initialization
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY,
-            region_name=Config.AWS_REGION
-        )
+        # AWS S3 settings (the client itself is created on first upload)
         self.s3_bucket = Config.S3_BUCKET_NAME
         self.s3_base_url = f"https://{self.s3_bucket}.s3.{Config.AWS_REGION}.amazonaws.com"
         
@@ -36,6 +31,11 @@ class MapGenerator:
         # initialize metadata file
         self._init_metadata_file()
     
+    @property
+    def s3_client(self):
+        """shared S3 client (created on first use)"""
+        return get_s3_client()
+    
     def _init_metadata_file(self):
         """initialize metadata file"""
         if not os.path.exists(self.maps_metadata_file):
@@ -43,7 +43,12 @@ class MapGenerator:
                 json.dump({"maps": {}, "used_styles": []}, f, ensure_ascii=False, indent=2)
     
     def generate_map_for_player(self, game_state: GameState, stage: int) -> Dict[str, Any]:
-        """generate map for player using ChatGPT and DALLE"""
+        """generate map for player using ChatGPT and DALLE (duplicate requests for the same player
+        and stage wait for the map already being generated)"""
+        return single_flight.run("map_generation", request_key(game_state.player_id, stage),
+                                 lambda: self._generate_map_for_player(game_state, stage))
+    
+    def _generate_map_for_player(self, game_state: GameState, stage: int) -> Dict[str, Any]:
         player_info = game_state.player_info
         conversation_history = game_state.conversation_history
         print(f"[map generation] stage: {stage}, player: {player_info.name}")
@@ -52,8 +57,8 @@ class MapGenerator:
         prompt = self._make_gpt_prompt(player_info, conversation_history, stage, game_state)
         print(f"[map recommendation] GPT prompt:\n{prompt}")
         
-        gpt_response = self.client.chat.completions.create(
-            model="gpt-4o",
+        gpt_response = model_router.complete(
+            "map_suggestion",
             messages=[
                 {"role": "system", "content": "You are an NPC that recommends creative game maps. Based on the player's preferences and conversations, recommend a map name and a short description that suits the player. Include the map name (in Korean or English) and a short description in your response."},
                 {"role": "user", "content": prompt}
@@ -61,6 +66,7 @@ class MapGenerator:
             max_tokens=200,
             temperature=1.0
         )
+        prompt_cache_stats.record("map_suggestion", gpt_response.usage)
         map_suggestion = gpt_response.choices[0].message.content.strip()
         print(f"[map recommendation] GPT recommendation result: {map_suggestion}")
         
@@ -79,12 +85,16 @@ class MapGenerator:
         print(f"[map generation] GPT image generation prompt: {dalle_prompt}")
         
         try:
-            dalle_response = self.client.images.generate(
-                model="gpt-image-1",
-                prompt=dalle_prompt,
-                n=1,
-                size="1024x1024",
-                quality="high"
+            dalle_response = single_flight.run(
+                "map_image",
+                request_key(dalle_prompt),
+                lambda: model_router.generate_image(
+                    "map_image",
+                    prompt=dalle_prompt,
+                    n=1,
+                    size="1024x1024",
+                    quality="high"
+                )
             )
             # decode image from b64_json field
             b64 = dalle_response.data[0].b64_json
@@ -189,9 +199,16 @@ class MapGenerator:
 
     def _make_gpt_prompt(self, player_info: PlayerInfo, conversation_history: list, stage: int, game_state=None) -> str:
         """generate GPT prompt"""
-        # recent 10 conversations
-        recent = conversation_history[-10:] if conversation_history else []
+        # rolling summary + short window of recent conversations
+        if game_state is not None:
+            recent = game_state.get_recent_conversations(Config.CONVERSATION_RECENT_WINDOW)
+            summary = game_state.get_conversation_summary()
+        else:
+            recent = conversation_history[-Config.CONVERSATION_RECENT_WINDOW:] if conversation_history else []
+            summary = ""
         chat = "\n".join([f"{c['speaker']}: {c['message']}" for c in recent])
+        if summary:
+            chat = f"(summary of earlier conversation)\n{summary}\n\n{chat}"
         
         # basic info
         location_info = f"\nlocation: {player_info.location}" if player_info.location else ""
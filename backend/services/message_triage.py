@@ -0,0 +1,88 @@
+import re
+import threading
+from typing import Any, Dict, List
+
+CHITCHAT_WORDS = {
+    "ok", "okay", "k", "kk", "yes", "yeah", "yep", "yup", "no", "nope", "nah", "sure", "fine", "cool",
+    "nice", "great", "good", "awesome", "wow", "oh", "ah", "hmm", "hm", "um", "uh", "lol", "lmao", "xd",
+    "thanks", "thank", "you", "thx", "ty", "hi", "hello", "hey", "bye", "got", "it", "i", "see", "alright",
+    "right", "true", "really", "sounds", "interesting", "that's", "thats", "so", "very", "too", "me",
+    "understood", "gotcha", "welcome", "please", "sorry", "np", "agreed", "indeed", "haha", "hehe", "ㅋㅋ", "ㅎㅎ",
+    "네", "응", "좋아", "감사합니다", "고마워"
+}
+
+COMMAND_VERBS = {
+    "go", "lets", "let's", "next", "continue", "start", "begin", "attack", "fight", "run", "move", "open",
+    "show", "proceed", "enter", "leave", "explore", "skip", "ready", "onward", "onwards", "forward"
+}
+
+COMMAND_WORDS = COMMAND_VERBS | {
+    "i'm", "im", "i", "am", "the", "a", "to", "now", "stage", "map", "ahead", "on", "let", "us", "it",
+    "please", "battle", "adventure", "monster", "boss", "quest", "journey", "okay", "ok", "yes", "already",
+    "again", "there", "in", "out", "back", "away", "then", "so", "do", "this", "that"
+}
+
+_LAUGH = re.compile(r"^(?:h+[aeiou]+){2,}h?$|^(?:ㅋ|ㅎ)+$|^x+d+$")
+
+class MessageTriage:
+    """label each player message as info-bearing, chit-chat or command.
+
+    chit-chat ("ok", "haha") and commands ("let's go") carry no player information and need no
+    memories, so extraction and retrieval are skipped for them. anything unclear is info-bearing.
+    while the stage is waiting for an answer that gates progress, a short reply ("no", "fine") may
+    be that answer, so chit-chat is still extracted then.
+    """
+
+    LABELS = ("info", "chitchat", "command")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {
+            "labels": {label: 0 for label in self.LABELS},
+            "extraction_calls_avoided": 0,
+            "retrieval_calls_avoided": 0
+        }
+
+    def classify(self, message: str, info_pending: bool = False) -> Dict[str, Any]:
+        """return {"label", "needs_extraction", "needs_retrieval"}; info_pending: an info question gating
+        stage progress is open (see StageManager.info_question_pending)"""
+        label = self._label(self._tokens(message))
+        with self._lock:
+            self.stats["labels"][label] += 1
+
+        needs_llm_context = label == "info"
+        needs_extraction = needs_llm_context or (info_pending and label == "chitchat")
+        return {"label": label, "needs_extraction": needs_extraction, "needs_retrieval": needs_llm_context}
+
+    def record_avoided(self, call: str):
+        """count a skipped call ("extraction" or "retrieval")"""
+        with self._lock:
+            self.stats[f"{call}_calls_avoided"] += 1
+
+    def _tokens(self, message: str) -> List[str]:
+        return re.findall(r"[\w'가-힣ㄱ-ㅎ]+", message.lower().replace("’", "'"))
+
+    def _label(self, tokens: List[str]) -> str:
+        if not tokens:
+            # emoji or punctuation only
+            return "chitchat"
+
+        if all(token in CHITCHAT_WORDS or _LAUGH.match(token) for token in tokens):
+            return "chitchat"
+
+        # short imperative phrases: "let's go", "next stage please", "attack the monster"
+        if len(tokens) <= 5 and any(token in COMMAND_VERBS for token in tokens) \
+                and all(token in COMMAND_WORDS or token in CHITCHAT_WORDS for token in tokens):
+            return "command"
+
+        return "info"
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self.stats["labels"].values())
+            return {
+                "messages": total,
+                "labels": dict(self.stats["labels"]),
+                "extraction_calls_avoided": self.stats["extraction_calls_avoided"],
+                "retrieval_calls_avoided": self.stats["retrieval_calls_avoided"]
+            }
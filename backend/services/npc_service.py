@@ -1,39 +1,90 @@
-from openai import OpenAI
-from typing import Dict, Any, Optional
-import os
-from dotenv import load_dotenv
-from utils.game_state import GameState
+from typing import Dict, Any, List, Optional
+import json
+import random
+from utils.game_state import GameState, Stage
 from utils.map_recommender import MapRecommender
+from utils.lazy_service import LazyService
+from utils.clients import openai_client, s3_client
+from utils.prompt_cache_stats import prompt_cache_stats
+from utils.model_router import model_router
 from vector_db.vector_store import VectorStore
+from vector_db.hybrid_retriever import HybridRetriever
 from services.stage_manager import StageManager
+from utils.structured_output import player_info_schema, validate_player_info, structured_output_stats
 from services.info_collector import InfoCollector
 from services.prompt_builder import PromptBuilder
+from services.conversation_summarizer import ConversationSummarizer
+from services.message_triage import MessageTriage
 
-load_dotenv()
+# strict JSON schema of a single-call turn (info delta + reply + optional follow-up question)
+NPC_TURN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "player_info": player_info_schema(),
+        "reply": {"type": "string"},
+        "next_question": {"type": ["string", "null"]}
+    },
+    "required": ["player_info", "reply", "next_question"],
+    "additionalProperties": False
+}
+
+# shown when a reply could not be generated; the player can simply say it again
+FALLBACK_REPLIES = [
+    "Hmm, the winds of this world are restless right now and I lost your words. Could you tell me that again?",
+    "Forgive me, adventurer, my thoughts drifted for a moment. What were you saying?",
+    "The magic around us flickered just now... Would you say that once more?",
+]
 
 class NPCService:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.map_recommender = MapRecommender()
-        self.vector_store = VectorStore()
+        # heavy dependencies are constructed lazily (first use or warm-up), not at import time
+        self._map_recommender = LazyService("MapRecommender", MapRecommender)
+        self._vector_store = LazyService("VectorStore", VectorStore)
+        self._retriever = LazyService("HybridRetriever", lambda: HybridRetriever(self.vector_store))
         
         # initialize new services
         self.stage_manager = StageManager()
         self.info_collector = InfoCollector()
         self.prompt_builder = PromptBuilder(self.stage_manager)
+        self.conversation_summarizer = ConversationSummarizer()
+        self.message_triage = MessageTriage()
     
-    def generate_response(self, player_message: str, game_state: GameState, player_id: str) -> str:
-        """generate NPC response to player message"""
-        
-        # add player message to conversation history
-        game_state.add_conversation("player", player_message)
-        
-        # save conversation to vector DB
+    @property
+    def map_recommender(self) -> MapRecommender:
+        return self._map_recommender.get()
+    
+    @property
+    def vector_store(self) -> VectorStore:
+        return self._vector_store.get()
+    
+    @property
+    def retriever(self) -> HybridRetriever:
+        return self._retriever.get()
+    
+    def get_lazy_services(self) -> Dict[str, LazyService]:
+        """return the lazily initialized dependencies (used for warm-up and readiness)"""
+        return {
+            "openai": openai_client,
+            "s3": s3_client,
+            "vector_store": self._vector_store,
+            "map_recommender": self._map_recommender
+        }
+    
+    def _record_conversation(self, game_state: GameState, player_id: str, speaker: str, message: str):
+        """add a turn to the conversation history and save it to vector DB"""
+        game_state.add_conversation(speaker, message)
         self.vector_store.add_conversation(player_id, {
-            "speaker": "player",
-            "message": player_message,
+            "speaker": speaker,
+            "message": message,
             "timestamp": game_state.conversation_history[-1]["timestamp"]
         })
+    
+    def generate_response(self, player_message: str, game_state: GameState, player_id: str,
+                          triage: Optional[Dict[str, Any]] = None) -> str:
+        """generate NPC response to player message (triage decides retrieval and the model size)"""
+        
+        # add player message to conversation history and vector DB
+        self._record_conversation(game_state, player_id, "player", player_message)
         
         # check and guide info collection
         info_collection_response = self._check_and_guide_info_collection(game_state)
@@ -43,33 +94,105 @@ class NPCService:
         else:
             print(f"🎮🎮🎮 generate normal response")
             # generate response based on current stage
-            response = self._generate_stage_specific_response(player_message, game_state, player_id)
+            response = self._generate_stage_specific_response(player_message, game_state, player_id, triage)
         
-        # add NPC response to conversation history
-        game_state.add_conversation("npc", response)
-        
-        # save NPC response to vector DB
-        self.vector_store.add_conversation(player_id, {
-            "speaker": "npc",
-            "message": response,
-            "timestamp": game_state.conversation_history[-1]["timestamp"]
-        })
+        # add NPC response to conversation history and vector DB
+        self._record_conversation(game_state, player_id, "npc", response)
         
         return response
     
-    def _generate_stage_specific_response(self, player_message: str, game_state: GameState, player_id: str) -> str:
+    def generate_structured_turn(self, player_message: str, game_state: GameState, player_id: str,
+                                 triage: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """single-call mode: extract the player info delta and write the NPC reply in one structured call.
+        returns {"player_info": extracted delta, "reply": NPC reply, "next_question": question or None}.
+        the player message is recorded here; the caller records the final reply with record_npc_reply."""
+        
+        self._record_conversation(game_state, player_id, "player", player_message)
+        relevant_context = self._retrieve_context(player_message, player_id, triage)
+        
+        brief = self._is_brief_turn(game_state, triage)
+        model = model_router.select("npc_turn", brief)
+        system_prompt, user_prompt = self.prompt_builder.build_chat_prompts(player_message, game_state, relevant_context, model)
+        user_prompt += self.prompt_builder.build_structured_turn_instructions(
+            self.info_collector.get_extraction_instructions(game_state.current_stage),
+            self.stage_manager.get_missing_info_for_stage(game_state)
+        )
+        
+        structured_output_stats.record("npc_turn", "requests")
+        structured_output_stats.record("npc_turn", "attempts")
+        try:
+            response = model_router.complete(
+                "npc_turn",
+                brief=brief,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {"name": "npc_turn", "strict": True, "schema": NPC_TURN_SCHEMA}
+                },
+                max_tokens=800,
+                temperature=0.7
+            )
+            prompt_cache_stats.record("npc_turn", response.usage, self.prompt_builder.static_prefix_tokens(game_state.current_stage))
+        except Exception as e:
+            structured_output_stats.record("npc_turn", "failures")
+            return {"player_info": {}, "reply": self._fallback_reply("npc_turn", e), "next_question": None}
+        
+        try:
+            result = json.loads(response.choices[0].message.content)
+            result["player_info"], invalid_fields = validate_player_info(result.get("player_info") or {})
+        except (TypeError, ValueError) as e:
+            structured_output_stats.record("npc_turn", "parse_failures")
+            structured_output_stats.record("npc_turn", "failures")
+            return {"player_info": {}, "reply": self._fallback_reply("npc_turn", e), "next_question": None}
+        
+        if invalid_fields:
+            structured_output_stats.record("npc_turn", "invalid_fields", len(invalid_fields))
+        print(f"🧩 single-call turn: extracted={result['player_info']}, next_question={bool(result.get('next_question'))}")
+        return result
+    
+    def record_npc_reply(self, game_state: GameState, player_id: str, response: str):
+        """record the NPC reply of a single-call turn"""
+        self._record_conversation(game_state, player_id, "npc", response)
+    
+    def _is_brief_turn(self, game_state: GameState, triage: Optional[Dict[str, Any]]) -> bool:
+        """chit-chat and commands get the small model (never in the boss stage)"""
+        return bool(triage) and triage["label"] != "info" and game_state.current_stage != Stage.BOSS
+    
+    def _retrieve_context(self, player_message: str, player_id: str, triage: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        """retrieve a few relevant, diverse past turns for the current message (lexical + vector)"""
+        if triage and not triage["needs_retrieval"]:
+            # chit-chat and commands: the recent turns are enough context
+            self.message_triage.record_avoided("retrieval")
+            return []
+        
+        try:
+            return self.retriever.retrieve(
+                player_message,
+                player_id,
+                exclude_texts=[f"player: {player_message}"]
+            )
+        except Exception as e:
+            print(f"⚠️ context retrieval failed: {e}")
+            return []
+    
+    def _generate_stage_specific_response(self, player_message: str, game_state: GameState, player_id: str,
+                                          triage: Optional[Dict[str, Any]] = None) -> str:
         """generate stage-specific response"""
         
-        # search player history
-        player_history = self.vector_store.get_player_history(player_id, limit=10)
+        relevant_context = self._retrieve_context(player_message, player_id, triage)
         
-        # build system prompt
-        system_prompt = self.prompt_builder.build_system_prompt(game_state, player_history)
-        user_prompt = self.prompt_builder.build_user_prompt(player_message, game_state)
+        # build prompts within the routed model's token budget (deduplicated context)
+        brief = self._is_brief_turn(game_state, triage)
+        model = model_router.select("npc_reply", brief)
+        system_prompt, user_prompt = self.prompt_builder.build_chat_prompts(player_message, game_state, relevant_context, model)
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4.1",
+            response = model_router.complete(
+                "npc_reply",
+                brief=brief,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
@@ -78,10 +201,16 @@ class NPCService:
                 temperature=0.7
             )
             
+            prompt_cache_stats.record("npc_reply", response.usage, self.prompt_builder.static_prefix_tokens(game_state.current_stage))
             return response.choices[0].message.content.strip()
             
         except Exception as e:
-            return f"Error: {str(e)}"
+            return self._fallback_reply("npc_reply", e)
+    
+    def _fallback_reply(self, call_site: str, error: Exception) -> str:
+        """in-character reply used when the model call failed after retries (never shown as an error)"""
+        print(f"❌ {call_site} failed, using a fallback reply: {error}")
+        return random.choice(FALLBACK_REPLIES)
     
     def extract_player_info(self, player_message: str, game_state: GameState) -> Dict[str, Any]:
         """extract information from player message"""
@@ -124,8 +253,8 @@ class NPCService:
             system_prompt = self.prompt_builder.build_stage_intro_prompt(game_state, player_history)
             
             # call OpenAI API
-            response = self.client.chat.completions.create(
-                model="gpt-4.1",
+            response = model_router.complete(
+                "stage_intro",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt}
@@ -134,6 +263,7 @@ class NPCService:
                 temperature=0.8
             )
             
+            prompt_cache_stats.record("stage_intro", response.usage, self.prompt_builder.stage_intro_prefix_tokens())
             stage_intro_message = response.choices[0].message.content.strip()
             
             # add generated message to conversation history
@@ -1,6 +1,9 @@
-from typing import Dict, List
-from utils.game_state import GameState
+from typing import Dict, List, Tuple
+from utils.game_state import GameState, Stage
 from services.stage_manager import StageManager
+from services.context_assembler import ContextAssembler
+from utils.token_counter import count_tokens
+from config import Config
 
 class PromptBuilder:
     """manage prompt generation"""
@@ -18,33 +21,21 @@ class PromptBuilder:
         important: focus only on collecting information required for the current stage, and do not mention stages or maps that the player has not yet reached.
         stage transition is only possible through the "next stage" button, and only then will a new map and adventure begin.
         """
-    
-    def build_system_prompt(self, game_state: GameState, player_history: List[Dict]) -> str:
-        """build system prompt"""
-        
-        # get stage instructions
-        stage_instructions = self.stage_manager.get_stage_instructions(game_state.current_stage)
         
-        # build player history text
-        history_text = ""
-        if player_history:
-            history_text = "\n".join([item["content"] for item in player_history[-5:]])
+        # precompiled static prompt prefixes (byte-stable, so provider-side prompt caching can hit).
+        # the stage-invariant part comes first so every stage shares it; a prefix shorter than
+        # Config.PROMPT_CACHE_MIN_TOKENS is never cached, which prompt_cache_stats reports per call site
+        self.shared_prefix = self._build_shared_prefix()
+        self.static_prefixes = {stage: self._build_static_prefix(stage) for stage in Stage}
+        self.stage_intro_prefix = self._build_stage_intro_prefix()
+        self._prefix_tokens: Dict[str, int] = {}
+    
+    def _build_shared_prefix(self) -> str:
+        """stage-invariant part of the system prompt (identical bytes for every stage)"""
         
-        system_prompt = f"""
+        return f"""
         {self.npc_personality}
         
-        {stage_instructions}
-        
-        current game state:
-        - stage: {game_state.current_stage.value}
-        - player info: {game_state.player_info.to_dict()}
-        - current map: {game_state.current_map or "none"}
-        - boss goal: {game_state.boss_goal or "not set"}
-        - life goal: {game_state.player_info.life_goal or "not set"}
-        
-        player history:
-        {history_text}
-        
         stage-specific approach:
         - 1st stage (tutorial): focus only on basic info collection (name, age, location, occupation, likes/hobbies, personality, life goal)
         - 2nd stage: focus only on fear info collection (fears)
@@ -72,55 +63,121 @@ class PromptBuilder:
         6. naturally emphasize the continuity of the story and the player's growth
         7. in 4-7 stages, focus on story expansion and character development to enrich the player's journey.
         """
-        
-        return system_prompt
     
-    def build_user_prompt(self, player_message: str, game_state: GameState) -> str:
-        """build user prompt"""
+    def _build_static_prefix(self, stage: Stage) -> str:
+        """static part of the system prompt for a stage: the shared prefix, then the stage instructions"""
         
-        # recent conversation history (max 10, use all if less than 10)
-        recent_conversations = game_state.conversation_history[-min(10, len(game_state.conversation_history)):]
+        stage_instructions = self.stage_manager.get_stage_instructions(stage)
+        
+        return self.shared_prefix + f"""
+        current stage instructions:
+        {stage_instructions}
+        """
+    
+    def get_static_prefix(self, stage: Stage) -> str:
+        """return the precompiled static prefix of a stage"""
+        return self.static_prefixes[stage]
+    
+    def static_prefix_tokens(self, stage: Stage) -> int:
+        """token count of a stage's static prefix (counted once)"""
+        return self._count_prefix(stage.name, self.static_prefixes[stage])
+    
+    def stage_intro_prefix_tokens(self) -> int:
+        """token count of the static stage intro prefix (counted once)"""
+        return self._count_prefix("stage_intro", self.stage_intro_prefix)
+    
+    def _count_prefix(self, name: str, prefix: str) -> int:
+        if name not in self._prefix_tokens:
+            self._prefix_tokens[name] = count_tokens(prefix)
+        return self._prefix_tokens[name]
+    
+    def build_chat_prompts(self, player_message: str, game_state: GameState,
+                           relevant_context: List[Dict], model: str) -> Tuple[str, str]:
+        """build (system prompt, user prompt) for an NPC reply within the model's token budget.
+        
+        the static prefix of the stage is always sent first and byte-stable; player info is sent once,
+        and recent turns, retrieved memories and the summary are deduplicated and fitted by priority."""
+        
+        assembler = ContextAssembler(model)
+        assembler.add("prefix", self.get_static_prefix(game_state.current_stage), required=True)
+        assembler.add("message", player_message, required=True)
+        assembler.add("game_state", self._format_game_state(game_state), priority=0)
+        
+        # the current message is already the last history turn; newer turns win the budget first
+        recent_turns = [
+            f"{conv['speaker']}: {conv['message']}"
+            for conv in game_state.get_recent_conversations(Config.CONVERSATION_RECENT_WINDOW)
+        ]
+        if recent_turns and recent_turns[-1] == f"player: {player_message}":
+            recent_turns = recent_turns[:-1]
+        for index, turn in enumerate(recent_turns):
+            assembler.add("recent", turn, source="recent_turns", priority=1 + len(recent_turns) - index)
+        
+        # retrieved memories already shown as recent turns are dropped as duplicates
+        for rank, item in enumerate(relevant_context):
+            assembler.add("memories", item["content"], priority=100 + rank)
+        
+        assembler.add("summary", game_state.get_conversation_summary(), priority=200)
+        
+        sections = assembler.assemble("npc_reply")
+        recent_text = "\n".join(sections.get("recent", []))
+        memories_text = "\n".join(sections.get("memories", []))
+        
+        # volatile data goes after the stable prefix so provider-side prompt caching can reuse the prefix
+        system_prompt = sections["prefix"][0] + f"""
+        current game state:
+        {"".join(sections.get("game_state", []))}
         
-        conversation_context = ""
-        if recent_conversations:
-            conversation_context = "\n".join([
-                f"{conv['speaker']}: {conv['message']}" 
-                for conv in recent_conversations
-            ])
+        relevant memories from earlier conversations:
+        {memories_text or "none"}
+        """
         
         user_prompt = f"""
-        recent 10 conversations:
-        {conversation_context}
+        summary of earlier conversation:
+        {"".join(sections.get("summary", [])) or "none"}
+        
+        recent conversations:
+        {recent_text or "none"}
         
         player's new message: {player_message}
         
         consider the above conversation context to generate a natural and personalized response.
         """
         
-        return user_prompt
+        return system_prompt, user_prompt
     
-    def build_stage_intro_prompt(self, game_state: GameState, player_history: List[Dict]) -> str:
-        """build stage intro prompt"""
+    def build_structured_turn_instructions(self, extraction_instructions: str, missing_info: List[str]) -> str:
+        """task instructions appended to the user prompt in single-call mode"""
+        return f"""
+        in this single response, do two tasks and return them as one JSON object:
         
-        # build history context
-        history_context = ""
-        if player_history:
-            history_context = "\n".join([item["content"] for item in player_history])
+        1. player_info: extract information from the player's new message.
+        {extraction_instructions}
+        set every field that is not mentioned in the new message to null.
+        
+        2. reply: your natural, personalized NPC response to the player's new message.
         
-        system_prompt = f"""
+        3. next_question: information still missing for the current stage: {", ".join(missing_info) or "none"}.
+        if something is missing and the new message does not provide it, write one short natural question asking for the first missing item; otherwise null.
+        do not ask that question inside reply.
+        """
+    
+    def _format_game_state(self, game_state: GameState) -> str:
+        """game state with the collected player info listed once (empty fields left out)"""
+        player_info = {key: value for key, value in game_state.player_info.to_dict().items() if value}
+        return f"""- stage: {game_state.current_stage.value}
+        - player info: {player_info or "none yet"}
+        - current map: {game_state.current_map or "none"}
+        - boss goal: {game_state.boss_goal or "not set"}"""
+    
+    def _build_stage_intro_prefix(self) -> str:
+        """static part of the stage intro system prompt"""
+        return f"""
         you are an NPC guide for a personalized adventure game. based on the player's personal information and conversation history, you need to lead the story.
 
 NPC personality:
 {self.npc_personality}
 
-current game state:
-- stage: {game_state.current_stage.value} ({game_state.current_stage.name})
-- player name: {game_state.player_info.name}
-- current map: {game_state.current_map or 'none'}
-
-recent conversation history:
-{history_context}
-
 requirements:
 1. use the player's personal information to write a personalized message
 2. explain why you recommended this map
@@ -132,6 +189,24 @@ requirements:
 8. 200-300 characters in length, if possible, if not, write as much as possible
 
 the message should be friendly and adventurous, and motivate the player to move to the next stage.
+"""
+    
+    def build_stage_intro_prompt(self, game_state: GameState, player_history: List[Dict]) -> str:
+        """build stage intro prompt (static prefix, then the volatile game state and history)"""
+        
+        # build history context
+        history_context = ""
+        if player_history:
+            history_context = "\n".join([item["content"] for item in player_history])
+        
+        volatile_suffix = f"""
+current game state:
+- stage: {game_state.current_stage.value} ({game_state.current_stage.name})
+- player name: {game_state.player_info.name}
+- current map: {game_state.current_map or 'none'}
+
+recent conversation history:
+{history_context}
 """
         
-        return system_prompt 
\ No newline at end of file
+        return self.stage_intro_prefix + volatile_suffix
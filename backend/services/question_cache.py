@@ -0,0 +1,185 @@
+import random
+import re
+import string
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from utils.game_state import GameState
+from config import Config
+
+# variants written offline per missing field. slots: {name}, {greeting} ("Min, " or ""), {interest},
+# {traits}, {likes}, {traits_needed}, {likes_needed}; a variant is used only if all its slots have values
+QUESTION_TEMPLATES: Dict[str, List[str]] = {
+    "name": [
+        "Welcome, traveler! Before our journey begins, what should I call you?",
+        "Every great adventure starts with a name. What's yours, brave one?",
+        "I have a feeling we'll be good companions. May I ask your name?",
+    ],
+    "age": [
+        "{greeting}how many years have you been walking this world? Knowing your age helps me shape your adventure.",
+        "{greeting}if you don't mind me asking, how old are you? It helps me prepare the right trials for you.",
+        "Tell me, {name}, how old are you? Every adventurer's story begins at a different point in life.",
+    ],
+    "location": [
+        "{greeting}where do you live? I'd love to weave a bit of your hometown into this world.",
+        "{greeting}where does your journey start in the real world? Which city or town do you call home?",
+        "Tell me, {name}, where are you from? Places shape the people who grow up in them.",
+    ],
+    "occupation": [
+        "{greeting}what do you do these days? Are you studying, working, or something else entirely?",
+        "{greeting}every hero has a craft. What's your job or field of study?",
+        "I'm curious, {name}: how do you spend your days? What's your occupation?",
+    ],
+    "life goal": [
+        "{greeting}what is the dream you're chasing in life? The final challenge of this journey will be tied to it.",
+        "{greeting}if you could achieve one big goal in your life, what would it be? Your answer will shape the last battle.",
+        "Tell me, {name}, what do you most want to accomplish in life? I need to know it before we complete the tutorial.",
+    ],
+    "personality": [
+        "{greeting}how would you describe your personality? Are you bold, calm, curious, something else?",
+        "{greeting}what kind of person are you? Tell me a few words your friends would use to describe you.",
+        "I'd like to know you better, {name}. How would you describe your personality?",
+    ],
+    "personality (more specific)": [
+        "{greeting}so far I know you're {traits}. Could you tell me {traits_needed} more trait(s)? I need at least 3 to finish the tutorial.",
+        "{greeting}you've described yourself as {traits}. What else is true about your personality? A couple more traits will complete your profile.",
+        "Besides being {traits}, what other sides of you should I know about, {name}? I need at least 3 traits to complete the tutorial.",
+    ],
+    "likes/hobbies": [
+        "{greeting}what do you enjoy doing in your free time? Hobbies, games, music, anything you love.",
+        "{greeting}what are the things that make you happy? Tell me about your hobbies and interests.",
+        "Every adventurer has a passion, {name}. What do you like to do for fun?",
+    ],
+    "likes/hobbies (more specific)": [
+        "{greeting}I know you like {likes}. What else do you enjoy? Tell me {likes_needed} more so I can complete your profile.",
+        "{greeting}besides {interest}, what other hobbies or interests do you have? A few more will help me finish the tutorial.",
+        "You enjoy {likes}, {name}. What other things do you love doing? I need a bit more to finish the tutorial.",
+    ],
+    "fears": [
+        "{greeting}every hero faces something that frightens them. What are you afraid of?",
+        "{greeting}what worries or scares you the most? Facing it here might make you stronger.",
+        "Tell me, {name}, is there something that makes you anxious or afraid? This stage is about courage.",
+    ],
+    "background": [
+        "{greeting}tell me a little about your past. What experiences shaped who you are today?",
+        "{greeting}what was your life like growing up? Any moments or people that changed you?",
+        "I'd love to hear your story, {name}. What important events or experiences brought you here?",
+    ],
+}
+
+class QuestionCache:
+    """info-collection questions keyed by their shape (stage, first missing field, trait/like counts).
+
+    keys are pre-populated with the offline variants above and filled with the player's name and
+    interests at runtime. the LLM is used only on a miss or for a sampled share of hits; its
+    questions are turned back into templates so the cache keeps learning new variants. a question
+    is learned only if no other personal detail of the player is left once the slots are replaced,
+    since a template is shared by every player whose question has the same shape.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._variants: Dict[Tuple, List[str]] = {}
+        self.stats = {"hits": 0, "misses": 0, "sampled": 0, "learned": 0, "rejected_personal": 0}
+
+    def _key(self, game_state: GameState, missing_info: List[str]) -> Tuple:
+        player_info = game_state.player_info
+        return (
+            game_state.current_stage.value,
+            missing_info[0],
+            min(len(player_info.personality_traits), 3),
+            min(len(player_info.likes), 4)
+        )
+
+    def get(self, game_state: GameState, missing_info: List[str]) -> Optional[str]:
+        """return a filled cached question, or None when the LLM should generate one"""
+        if not Config.QUESTION_CACHE_ENABLED or not missing_info:
+            return None
+
+        key = self._key(game_state, missing_info)
+        slots = self._slots(game_state)
+        with self._lock:
+            variants = self._variants.setdefault(key, list(QUESTION_TEMPLATES.get(missing_info[0], [])))
+            usable = [variant for variant in variants if self._fillable(variant, slots)]
+
+            if not usable:
+                self.stats["misses"] += 1
+                return None
+            if random.random() < Config.QUESTION_LLM_SAMPLE_RATE:
+                # refresh: let the LLM write a new variant now and then
+                self.stats["sampled"] += 1
+                return None
+            self.stats["hits"] += 1
+
+        question = random.choice(usable).format(**slots)
+        return question[0].upper() + question[1:]
+
+    def learn(self, game_state: GameState, missing_info: List[str], question: str):
+        """store an LLM question as a template (player name and interests replaced by slots)"""
+        if not Config.QUESTION_CACHE_ENABLED or not missing_info or not question:
+            return
+
+        template = question.replace("{", "{{").replace("}", "}}")
+        slots = self._slots(game_state)
+        # longest values first, so "art, chess" becomes {likes} before "art" becomes {interest}
+        slot_values = sorted(
+            ((slot, slots[slot]) for slot in ("name", "interest", "traits", "likes") if slots[slot]),
+            key=lambda item: len(item[1]), reverse=True
+        )
+        for slot, value in slot_values:
+            template = self._word_pattern(value).sub("{" + slot + "}", template)
+
+        # the question may mention the player's location, occupation, other likes, ...
+        leftover = [value for value in self._personal_values(game_state) if self._word_pattern(value).search(template)]
+
+        key = self._key(game_state, missing_info)
+        with self._lock:
+            if leftover:
+                self.stats["rejected_personal"] += 1
+                return
+            variants = self._variants.setdefault(key, list(QUESTION_TEMPLATES.get(missing_info[0], [])))
+            if template not in variants and len(variants) < Config.QUESTION_CACHE_MAX_VARIANTS:
+                variants.append(template)
+                self.stats["learned"] += 1
+
+    def _word_pattern(self, value: str) -> re.Pattern:
+        """whole-word, case-insensitive match of value ("art" does not match inside "start")"""
+        return re.compile(rf"(?<!\w){re.escape(value)}(?!\w)", re.I)
+
+    def _personal_values(self, game_state: GameState) -> List[str]:
+        values = []
+        for value in game_state.player_info.to_dict().values():
+            for item in value if isinstance(value, list) else [value]:
+                if item not in (None, ""):
+                    values.append(str(item))
+        return values
+
+    def _slots(self, game_state: GameState) -> Dict[str, Any]:
+        player_info = game_state.player_info
+        interests = player_info.likes or player_info.personality_traits
+        return {
+            "name": player_info.name,
+            "greeting": f"{player_info.name}, " if player_info.name else "",
+            "interest": interests[0] if interests else "",
+            "traits": ", ".join(player_info.personality_traits),
+            "likes": ", ".join(player_info.likes),
+            "traits_needed": max(3 - len(player_info.personality_traits), 1),
+            "likes_needed": max(4 - len(player_info.likes), 1)
+        }
+
+    def _fillable(self, template: str, slots: Dict[str, Any]) -> bool:
+        """every slot of the template has a value ({greeting} may be empty)"""
+        for _, field, _, _ in string.Formatter().parse(template):
+            if field is None:
+                continue
+            if field not in slots or (field != "greeting" and slots[field] in ("", None)):
+                return False
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["sampled"]
+            return {
+                **self.stats,
+                "keys": len(self._variants),
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0
+            }
@@ -1,17 +1,11 @@
 from typing import List
 from utils.game_state import GameState, Stage
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from utils.clients import get_openai_client
 
 class StageManager:
     """manage stage-specific logic"""
     
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
         # define stage-specific instructions
         self.stage_instructions = {
             Stage.TUTORIAL: self._get_tutorial_instructions(),
@@ -24,6 +18,11 @@ class StageManager:
             Stage.BOSS: self._get_boss_instructions()
         }
     
+    @property
+    def client(self):
+        """shared OpenAI client (created on first use)"""
+        return get_openai_client()
+    
     def get_stage_instructions(self, stage: Stage) -> str:
         """return instructions for the current stage"""
         return self.stage_instructions.get(stage, "")
@@ -68,6 +67,14 @@ class StageManager:
         
         return missing_info
     
+    def extraction_gates_progress(self, stage: Stage) -> bool:
+        """whether stage completion depends on extracted player info (tutorial, stage 2, stage 3)"""
+        return stage in (Stage.TUTORIAL, Stage.STAGE_2, Stage.STAGE_3)
+    
+    def info_question_pending(self, game_state: GameState) -> bool:
+        """whether the stage still waits for player info that gates its completion"""
+        return self.extraction_gates_progress(game_state.current_stage) and bool(self.get_missing_info_for_stage(game_state))
+    
     def is_stage_complete(self, game_state: GameState) -> bool:
         """check if the current stage is complete"""
         current_stage = game_state.current_stage
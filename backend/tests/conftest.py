@@ -0,0 +1,5 @@
+import os
+import sys
+
+# tests import the backend modules the same way main.py does (run pytest from the backend directory)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
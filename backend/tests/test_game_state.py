@@ -0,0 +1,42 @@
+from config import Config
+from services.conversation_summarizer import ConversationSummarizer
+from utils.game_state import GameState
+
+def add_turns(game_state: GameState, count: int):
+    for _ in range(count):
+        index = len(game_state.conversation_history)
+        game_state.add_conversation("player" if index % 2 == 0 else "npc", f"turn {index}")
+
+def visible(game_state: GameState) -> set:
+    """indices of the history entries that are either summarized or sent verbatim"""
+    recent = game_state.get_recent_conversations(Config.CONVERSATION_RECENT_WINDOW)
+    return set(range(game_state.summarized_upto)) | {int(turn["message"].split()[1]) for turn in recent}
+
+def test_recent_window_covers_unsummarized_turns_before_summarization_starts():
+    game_state = GameState()
+    summarizer = ConversationSummarizer()
+    scheduled = []
+    summarizer._executor.submit = lambda fn, state, fold_upto: scheduled.append(fold_upto)
+
+    # the summarizer only starts at window + SUMMARY_BATCH_TURNS unsummarized entries
+    threshold = Config.CONVERSATION_RECENT_WINDOW + Config.SUMMARY_BATCH_TURNS
+    for total in range(1, threshold + 1):
+        add_turns(game_state, 1)
+        summarizer.maybe_schedule(game_state)
+        assert visible(game_state) == set(range(total))
+    assert scheduled == [Config.SUMMARY_BATCH_TURNS]
+
+def test_turns_arriving_while_a_summary_job_runs_stay_in_the_prompt():
+    game_state = GameState()
+    add_turns(game_state, Config.CONVERSATION_RECENT_WINDOW + Config.SUMMARY_BATCH_TURNS)
+    fold_upto = len(game_state.conversation_history) - Config.CONVERSATION_RECENT_WINDOW
+
+    # the background job is still running while more turns arrive
+    add_turns(game_state, 2 * Config.CONVERSATION_RECENT_WINDOW)
+    assert visible(game_state) == set(range(len(game_state.conversation_history)))
+
+    # once it finishes, the folded turns leave the verbatim window
+    game_state.summarized_upto = fold_upto
+    recent = game_state.get_recent_conversations(Config.CONVERSATION_RECENT_WINDOW)
+    assert recent[0]["message"] == f"turn {fold_upto}"
+    assert visible(game_state) == set(range(len(game_state.conversation_history)))
@@ -0,0 +1,42 @@
+import pytest
+from services.message_triage import MessageTriage
+from services.stage_manager import StageManager
+from utils.game_state import GameState, Stage
+
+ANSWER_LIKE_REPLIES = ["no", "fine", "good", "cool", "nice", "sure"]
+
+def game_in(stage: Stage) -> GameState:
+    game_state = GameState()
+    game_state.current_stage = stage
+    return game_state
+
+@pytest.mark.parametrize("reply", ANSWER_LIKE_REPLIES)
+@pytest.mark.parametrize("stage", [Stage.TUTORIAL, Stage.STAGE_2, Stage.STAGE_3])
+def test_short_reply_to_a_pending_info_question_is_extracted(stage, reply):
+    # e.g. the tutorial personality question or the stage 2 fears question is still open
+    game_state = game_in(stage)
+    assert StageManager().info_question_pending(game_state)
+
+    triage = MessageTriage().classify(reply, StageManager().info_question_pending(game_state))
+    assert triage["label"] == "chitchat"
+    assert triage["needs_extraction"]
+    assert not triage["needs_retrieval"]
+
+def test_chitchat_skips_extraction_when_no_info_question_gates_progress():
+    game_state = game_in(Stage.STAGE_4)
+    assert not StageManager().info_question_pending(game_state)
+
+    triage = MessageTriage().classify("fine", StageManager().info_question_pending(game_state))
+    assert not triage["needs_extraction"]
+
+def test_chitchat_skips_extraction_once_the_stage_info_is_collected():
+    game_state = game_in(Stage.STAGE_2)
+    game_state.player_info.fears = ["the dark"]
+    assert not StageManager().info_question_pending(game_state)
+
+    assert not MessageTriage().classify("cool", StageManager().info_question_pending(game_state))["needs_extraction"]
+
+def test_commands_never_need_extraction():
+    triage = MessageTriage().classify("let's go", info_pending=True)
+    assert triage["label"] == "command"
+    assert not triage["needs_extraction"]
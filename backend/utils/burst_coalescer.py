@@ -0,0 +1,140 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from config import Config
+
+class TurnSuperseded(Exception):
+    """a newer message arrived before the turn was committed; the merged burst replaces it"""
+
+class ChatBurst:
+    """rapid consecutive messages of one player, handled as one logical turn"""
+
+    def __init__(self, coalescer: "BurstCoalescer", player_id: str, messages: List[str], extracted: int = 0):
+        self._coalescer = coalescer
+        self.player_id = player_id
+        self.messages = list(messages)
+        self.extracted = extracted  # leading messages whose info was already extracted by a superseded turn
+        now = time.monotonic()
+        self.deadline = now + Config.CHAT_BURST_WINDOW_SECONDS
+        self.max_deadline = now + Config.CHAT_BURST_MAX_WAIT_SECONDS
+        self.started = False
+        self.committed = False
+        self.superseded = False
+        self.successor: Optional["ChatBurst"] = None
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    @property
+    def message(self) -> str:
+        return "\n".join(self.messages)
+
+    @property
+    def unextracted_message(self) -> str:
+        return "\n".join(self.messages[self.extracted:])
+
+    def start(self):
+        """the turn begins: later messages supersede it (until commit) instead of joining it"""
+        with self._coalescer._lock:
+            self.started = True
+
+    def mark_extracted(self):
+        with self._coalescer._lock:
+            self.extracted = len(self.messages)
+            # a burst that superseded this turn starts with these messages and need not extract them again
+            if self.successor is not None:
+                self.successor.extracted = max(self.successor.extracted, self.extracted)
+
+    def commit(self):
+        """point of no return (stage checks and the reply); raises TurnSuperseded if a newer message arrived"""
+        with self._coalescer._lock:
+            if self.superseded:
+                raise TurnSuperseded(f"turn of {self.player_id} superseded by a newer message")
+            self.committed = True
+            if self._coalescer._open.get(self.player_id) is self:
+                del self._coalescer._open[self.player_id]
+
+class BurstCoalescer:
+    """per-player debounce on the chat path.
+
+    a message opens a burst; messages that arrive within Config.CHAT_BURST_WINDOW_SECONDS of the
+    previous one (capped at CHAT_BURST_MAX_WAIT_SECONDS) join it, and the burst runs as one turn
+    whose reply is returned to every waiting request. a message that arrives after the turn started
+    but before it committed supersedes it: the turn stops at its commit point and a new burst with
+    all messages runs instead, skipping the extraction already done for the earlier ones.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open: Dict[str, ChatBurst] = {}
+        self._stats = {"turns": 0, "messages": 0, "coalesced_messages": 0, "superseded_turns": 0}
+
+    def submit(self, player_id: str, message: str, run_turn: Callable[[ChatBurst], Any]) -> Any:
+        """add a message to the player's burst and return the reply of the turn it ends up in"""
+        with self._lock:
+            self._stats["messages"] += 1
+            burst = self._open.get(player_id)
+            if burst is None:
+                burst = self._open[player_id] = ChatBurst(self, player_id, [message])
+                self._stats["turns"] += 1
+                leader = True
+            elif burst.started:
+                # the running turn replies to stale context: replace it with the merged burst
+                successor = ChatBurst(self, player_id, burst.messages + [message], burst.extracted)
+                burst.superseded = True
+                burst.successor = successor
+                burst = self._open[player_id] = successor
+                self._stats["superseded_turns"] += 1
+                self._stats["coalesced_messages"] += 1
+                leader = True
+            else:
+                burst.messages.append(message)
+                burst.deadline = min(time.monotonic() + Config.CHAT_BURST_WINDOW_SECONDS, burst.max_deadline)
+                self._stats["coalesced_messages"] += 1
+                leader = False
+
+        if leader:
+            return self._lead(burst, run_turn)
+        return self._await(burst)
+
+    def _lead(self, burst: ChatBurst, run_turn: Callable[[ChatBurst], Any]) -> Any:
+        # debounce: wait until the player has been quiet for the window
+        while True:
+            with self._lock:
+                remaining = burst.deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(remaining)
+
+        try:
+            burst.result = run_turn(burst)
+            return burst.result
+        except BaseException as e:
+            if burst.superseded:
+                # the merged burst answers this request too
+                burst.done.set()
+                return self._await(burst.successor)
+            burst.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._open.get(burst.player_id) is burst:
+                    del self._open[burst.player_id]
+            burst.done.set()
+
+    def _await(self, burst: ChatBurst) -> Any:
+        while True:
+            burst.done.wait()
+            if burst.superseded and burst.successor is not None:
+                burst = burst.successor
+                continue
+            if burst.error is not None:
+                raise burst.error
+            return burst.result
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["open_bursts"] = len(self._open)
+            stats["messages_per_turn"] = round(stats["messages"] / stats["turns"], 2) if stats["turns"] else 0.0
+            return stats
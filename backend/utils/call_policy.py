@@ -0,0 +1,210 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+from config import Config
+
+RETRYABLE_ERRORS = {
+    "APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError",
+    "ServiceUnavailableError", "TimeoutError", "ConnectionError", "ReadTimeout", "ConnectTimeout"
+}
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+class CallDeadlineExceeded(TimeoutError):
+    """the per-call-site deadline ran out before an attempt succeeded"""
+
+class AttemptControl:
+    """handle of one attempt: marks when the request was actually sent and whether it lost a hedge race"""
+
+    def __init__(self, cond: Optional[threading.Condition] = None):
+        self._cond = cond or threading.Condition()
+        self.cancelled = threading.Event()
+        self.started_at: Optional[float] = None
+
+    def mark_started(self):
+        """called once the request is sent (after any rate-limit wait)"""
+        with self._cond:
+            self.started_at = time.monotonic()
+            self._cond.notify_all()
+
+class _HedgeRace:
+    """primary and hedge attempts on their own threads; the first success wins, the loser is ignored"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.controls: Dict[str, AttemptControl] = {}
+        self.pending = 0
+        self.winner: Optional[str] = None
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.winner is not None or (self.pending == 0 and self.error is not None)
+
+    def start(self, name: str, request: Callable[[float, AttemptControl], Any], timeout: float) -> AttemptControl:
+        control = AttemptControl(self.cond)
+        with self.cond:
+            self.controls[name] = control
+            self.pending += 1
+        threading.Thread(target=self._run, args=(name, request, timeout, control), daemon=True, name=f"hedge-{name}").start()
+        return control
+
+    def _run(self, name: str, request: Callable[[float, AttemptControl], Any], timeout: float, control: AttemptControl):
+        try:
+            result = request(timeout, control)
+        except BaseException as e:
+            with self.cond:
+                self.pending -= 1
+                self.error = self.error or e
+                self.cond.notify_all()
+            return
+        with self.cond:
+            self.pending -= 1
+            if self.winner is None:
+                self.winner, self.result = name, result
+            self.cond.notify_all()
+
+    def cancel(self):
+        """stop attempts that are still waiting for a rate-limit slot"""
+        for control in self.controls.values():
+            control.cancelled.set()
+
+class OutboundCallPolicy:
+    """deadline, retry and hedging policy applied to every outbound model call.
+
+    each call site has an overall deadline (Config.CALL_POLICIES). retryable errors (timeouts,
+    connection errors, 429, 5xx) are retried with jittered exponential backoff inside that deadline.
+    with hedging on, a duplicate request is sent once an attempt has been in flight longer than the
+    call site's observed latency percentile, and the first successful response wins. attempts without
+    hedging run in the caller's thread.
+    """
+
+    def __init__(self, latency_window: int = 200):
+        self._lock = threading.Lock()
+        self._latency_window = latency_window
+        self._latencies: Dict[str, deque] = {}
+        self._sites: Dict[str, Dict[str, int]] = {}
+
+    def get_policy(self, call_site: str) -> Dict[str, Any]:
+        return Config.CALL_POLICIES.get(call_site, Config.CALL_POLICIES["default"])
+
+    def execute(self, call_site: str, request: Callable[[float, AttemptControl], Any], timeout: float,
+                deadline: Optional[float] = None) -> Any:
+        """run request(attempt_timeout, control) under the call site's policy. deadline (a time.monotonic()
+        value) caps the call site's own deadline, e.g. for a fallback after a timed-out primary model."""
+        policy = self.get_policy(call_site)
+        policy_deadline = time.monotonic() + policy["deadline"]
+        deadline = min(deadline, policy_deadline) if deadline is not None else policy_deadline
+        self._count(call_site, "calls")
+
+        for attempt in range(policy["max_retries"] + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._count(call_site, "deadline_exceeded")
+                raise CallDeadlineExceeded(f"{call_site}: deadline of {policy['deadline']}s exceeded")
+
+            if attempt:
+                self._count(call_site, "retries")
+            self._count(call_site, "attempts")
+
+            try:
+                result, latency = self._attempt(call_site, request, min(timeout, remaining), policy)
+            except Exception as e:
+                if not self.is_retryable(e):
+                    self._count(call_site, "non_retryable_errors")
+                    raise
+                self._count(call_site, "retryable_errors")
+                if attempt == policy["max_retries"]:
+                    self._count(call_site, "gave_up")
+                    raise
+
+                # full jitter: sleep a random share of the exponential backoff, within the deadline
+                backoff = min(Config.RETRY_MAX_DELAY_SECONDS, Config.RETRY_BASE_DELAY_SECONDS * 2 ** attempt)
+                delay = min(random.uniform(0, backoff), max(deadline - time.monotonic(), 0))
+                print(f"⚠️ {call_site}: retryable error ({type(e).__name__}), retry {attempt + 1} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            self._record_latency(call_site, latency)
+            return result
+
+    def _attempt(self, call_site: str, request: Callable[[float, AttemptControl], Any], timeout: float,
+                 policy: Dict[str, Any]) -> Tuple[Any, float]:
+        """one attempt (hedged if enabled); returns the result and the request latency (rate-limit wait excluded)"""
+        hedge_delay = self._hedge_delay(call_site) if policy["hedge"] else None
+        if hedge_delay is None or hedge_delay >= timeout:
+            control = AttemptControl()
+            start = time.monotonic()
+            result = request(timeout, control)
+            return result, time.monotonic() - (control.started_at or start)
+
+        end = time.monotonic() + timeout
+        race = _HedgeRace()
+        primary = race.start("primary", request, timeout)
+        with race.cond:
+            # the hedge delay counts from when the primary request was sent, not from any wait before it
+            race.cond.wait_for(lambda: race.finished or primary.started_at is not None, timeout=timeout)
+            if not race.finished and primary.started_at is not None:
+                race.cond.wait_for(lambda: race.finished, timeout=max(primary.started_at + hedge_delay - time.monotonic(), 0))
+            send_hedge = not race.finished and primary.started_at is not None and end - time.monotonic() > 0.1
+
+        if send_hedge:
+            # the primary is slower than the latency percentile: send a duplicate and take the first success
+            self._count(call_site, "hedges")
+            race.start("hedge", request, end - time.monotonic())
+
+        with race.cond:
+            race.cond.wait_for(lambda: race.finished, timeout=max(end - time.monotonic(), 0))
+            race.cancel()
+            if race.winner is not None:
+                if race.winner == "hedge":
+                    self._count(call_site, "hedge_wins")
+                winner = race.controls[race.winner]
+                return race.result, time.monotonic() - (winner.started_at or end - timeout)
+            if race.error is not None:
+                raise race.error
+        raise TimeoutError(f"{call_site}: attempt timed out after {timeout:.1f}s")
+
+    def _hedge_delay(self, call_site: str) -> Optional[float]:
+        """latency percentile of recent successful attempts (None until enough samples)"""
+        with self._lock:
+            return self._latency_percentile(call_site)
+
+    def _latency_percentile(self, call_site: str) -> Optional[float]:
+        latencies = sorted(self._latencies.get(call_site, ()))
+        if len(latencies) < Config.HEDGE_MIN_SAMPLES:
+            return None
+        return latencies[min(int(len(latencies) * Config.HEDGE_PERCENTILE), len(latencies) - 1)]
+
+    def is_retryable(self, error: BaseException) -> bool:
+        if isinstance(error, CallDeadlineExceeded):
+            return False
+        if type(error).__name__ in RETRYABLE_ERRORS or isinstance(error, (TimeoutError, ConnectionError)):
+            return True
+        status_code = getattr(error, "status_code", None)
+        return status_code in RETRYABLE_STATUS_CODES or (isinstance(status_code, int) and status_code >= 500)
+
+    def _record_latency(self, call_site: str, seconds: float):
+        with self._lock:
+            self._latencies.setdefault(call_site, deque(maxlen=self._latency_window)).append(seconds)
+
+    def _count(self, call_site: str, event: str):
+        with self._lock:
+            site = self._sites.setdefault(call_site, {
+                "calls": 0, "attempts": 0, "retries": 0, "retryable_errors": 0, "non_retryable_errors": 0,
+                "gave_up": 0, "deadline_exceeded": 0, "hedges": 0, "hedge_wins": 0
+            })
+            site[event] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {}
+            for call_site, site in self._sites.items():
+                hedge_after = self._latency_percentile(call_site)
+                stats[call_site] = {**site, "hedge_after_seconds": round(hedge_after, 3) if hedge_after is not None else None}
+            return stats
+
+# process-wide instance shared by all outbound model calls
+call_policy = OutboundCallPolicy()
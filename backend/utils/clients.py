@@ -0,0 +1,29 @@
+from utils.lazy_service import LazyService
+from config import Config
+
+# shared outbound clients. SDK imports are deferred so importing main.py stays cheap.
+
+def _create_openai_client():
+    from openai import OpenAI
+    # retries are handled by utils.call_policy, not by the SDK
+    return OpenAI(api_key=Config.OPENAI_API_KEY, max_retries=0)
+
+def _create_s3_client():
+    import boto3
+    return boto3.client(
+        's3',
+        aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY,
+        region_name=Config.AWS_REGION
+    )
+
+openai_client = LazyService("OpenAI client", _create_openai_client)
+s3_client = LazyService("S3 client", _create_s3_client)
+
+def get_openai_client():
+    """return the process-wide OpenAI client"""
+    return openai_client.get()
+
+def get_s3_client():
+    """return the process-wide S3 client"""
+    return s3_client.get()
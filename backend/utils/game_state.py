@@ -57,6 +57,10 @@ class GameState(BaseModel):
 
     monster_defeated: bool = False  # monster defeated status (updated by frontend)
     
+    # rolling summaries of older turns per stage (updated off the request path)
+    stage_summaries: Dict[int, str] = {}
+    summarized_upto: int = 0  # number of conversation_history entries folded into stage_summaries
+    
     # track elements used for map recommendation (to avoid duplicates)
     used_map_elements: Dict[str, List[str]] = {
         "personality_traits": [],
@@ -73,9 +77,27 @@ class GameState(BaseModel):
         self.conversation_history.append({
             "speaker": speaker,
             "message": message,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now().isoformat(),
+            "stage": str(self.current_stage.value)
         })
     
+    def get_recent_conversations(self, window: int) -> List[Dict[str, str]]:
+        """returns the recent turns to show verbatim next to the rolling summary.
+        turns not folded into the summary yet are always included (summarization runs in the
+        background and only once SUMMARY_BATCH_TURNS turns are pending), so no turn is in neither;
+        the prompt's token budget decides how many of them fit."""
+        total = len(self.conversation_history)
+        start = min(max(total - window, 0), self.summarized_upto)
+        return self.conversation_history[start:]
+    
+    def get_conversation_summary(self) -> str:
+        """returns the rolling summaries of older turns, one line per stage"""
+        return "\n".join(
+            f"stage {stage}: {summary}"
+            for stage, summary in sorted(self.stage_summaries.items())
+            if summary
+        )
+    
     def update_player_info(self, **kwargs):
         """updates player info"""
         for key, value in kwargs.items():
@@ -0,0 +1,209 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from config import Config
+
+class IdempotencyKeyReused(ValueError):
+    """an Idempotency-Key was sent again with a different request"""
+
+class StoredClientError(Exception):
+    """a client error (4xx) stored for an Idempotency-Key by another worker, replayed as is"""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+class _Entry:
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.expires_at = float("inf")  # set once the response is stored
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class IdempotencyStore:
+    """stored responses of state-changing requests, keyed by (endpoint, Idempotency-Key).
+
+    the first request with a key runs; a repeat within the TTL gets the stored response (or the
+    stored client error) without running the handler again, and a repeat that arrives while the
+    first is still running waits for it. server errors (5xx) and conflicts (409) are not stored, so
+    the client can retry.
+    """
+
+    def __init__(self, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.IDEMPOTENCY_TTL_SECONDS
+        self.max_entries = max_entries if max_entries is not None else Config.IDEMPOTENCY_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._stats = {"executions": 0, "replays": 0, "key_conflicts": 0, "not_stored": 0}
+
+    def run(self, endpoint: str, key: str, fingerprint: str, handler: Callable[[], Any]) -> Any:
+        """run handler once per (endpoint, key); fingerprint identifies the request the key was sent with"""
+        with self._lock:
+            self._evict_expired()
+            entry = self._entries.get((endpoint, key))
+            if entry is not None and entry.fingerprint != fingerprint:
+                self._stats["key_conflicts"] += 1
+                raise IdempotencyKeyReused(f"Idempotency-Key {key!r} was already used for a different {endpoint} request")
+            leader = entry is None
+            if leader:
+                entry = self._entries[(endpoint, key)] = _Entry(fingerprint)
+                self._stats["executions"] += 1
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._stats["replays"] += 1
+
+        if not leader:
+            entry.done.wait()
+            if entry.error is not None:
+                raise entry.error
+            return entry.result
+
+        try:
+            entry.result = handler()
+            return entry.result
+        except BaseException as e:
+            entry.error = e
+            if not self._is_client_error(e):
+                # not stored: a retry with the same key runs again
+                with self._lock:
+                    self._stats["not_stored"] += 1
+                    if self._entries.get((endpoint, key)) is entry:
+                        del self._entries[(endpoint, key)]
+            raise
+        finally:
+            entry.expires_at = time.monotonic() + self.ttl_seconds
+            entry.done.set()
+
+    def _is_client_error(self, error: BaseException) -> bool:
+        # 409 (state conflict with another worker) is transient: the retry must run again
+        status_code = getattr(error, "status_code", None)
+        return isinstance(status_code, int) and 400 <= status_code < 500 and status_code != 409
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._evict_expired()
+            return {**self._stats, "stored": len(self._entries), "ttl_seconds": self.ttl_seconds}
+
+class SQLiteIdempotencyStore(IdempotencyStore):
+    """idempotency records shared by all worker processes, in the session database (SESSION_STORE=sqlite).
+
+    a retry with the same key may reach another worker: it replays the stored response, or waits
+    while the first worker is still running the request. handler results must be JSON-serializable.
+    a running record expires after SESSION_LEASE_SECONDS, so a key whose worker died can run again.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl_seconds: Optional[int] = None):
+        super().__init__(ttl_seconds=ttl_seconds)
+        self.db_path = db_path or Config.SESSION_DB_PATH
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS idempotency (
+                endpoint TEXT NOT NULL,
+                key TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error_status INTEGER,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (endpoint, key)
+            )
+        """)
+        self._conn.commit()
+
+    def run(self, endpoint: str, key: str, fingerprint: str, handler: Callable[[], Any]) -> Any:
+        owner = uuid.uuid4().hex
+        counted = False
+        while True:
+            with self._lock:
+                now = time.time()
+                self._conn.execute("DELETE FROM idempotency WHERE expires_at <= ?", (now,))
+                cursor = self._conn.execute(
+                    "INSERT INTO idempotency (endpoint, key, fingerprint, owner, expires_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(endpoint, key) DO NOTHING",
+                    (endpoint, key, fingerprint, owner, now + Config.SESSION_LEASE_SECONDS)
+                )
+                self._conn.commit()
+                leader = cursor.rowcount == 1
+                row = None if leader else self._conn.execute(
+                    "SELECT fingerprint, done, result, error_status FROM idempotency WHERE endpoint = ? AND key = ?",
+                    (endpoint, key)
+                ).fetchone()
+
+                if leader:
+                    self._stats["executions"] += 1
+                elif row is not None and row[0] != fingerprint:
+                    self._stats["key_conflicts"] += 1
+                    raise IdempotencyKeyReused(f"Idempotency-Key {key!r} was already used for a different {endpoint} request")
+                elif row is not None and not counted:
+                    counted = True
+                    self._stats["replays"] += 1
+
+            if leader:
+                return self._run_leader(endpoint, key, owner, handler)
+            if row is not None and row[1]:
+                result = json.loads(row[2])
+                if row[3] is not None:
+                    raise StoredClientError(row[3], result)
+                return result
+            # still running in another worker (or gone because it failed): check again shortly
+            time.sleep(0.1)
+
+    def _run_leader(self, endpoint: str, key: str, owner: str, handler: Callable[[], Any]) -> Any:
+        try:
+            result = handler()
+        except BaseException as e:
+            with self._lock:
+                if self._is_client_error(e):
+                    self._conn.execute(
+                        "UPDATE idempotency SET done = 1, result = ?, error_status = ?, expires_at = ? "
+                        "WHERE endpoint = ? AND key = ? AND owner = ?",
+                        (json.dumps(getattr(e, "detail", str(e))), e.status_code, time.time() + self.ttl_seconds, endpoint, key, owner)
+                    )
+                else:
+                    # not stored: a retry with the same key runs again
+                    self._stats["not_stored"] += 1
+                    self._conn.execute("DELETE FROM idempotency WHERE endpoint = ? AND key = ? AND owner = ?", (endpoint, key, owner))
+                self._conn.commit()
+            raise
+        with self._lock:
+            self._conn.execute(
+                "UPDATE idempotency SET done = 1, result = ?, expires_at = ? WHERE endpoint = ? AND key = ? AND owner = ?",
+                (json.dumps(result), time.time() + self.ttl_seconds, endpoint, key, owner)
+            )
+            self._conn.commit()
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM idempotency WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+            return {**self._stats, "stored": stored, "ttl_seconds": self.ttl_seconds}
+
+def create_idempotency_store() -> IdempotencyStore:
+    """idempotency store next to the session store: shared by all workers with SESSION_STORE=sqlite"""
+    if Config.SESSION_STORE == "sqlite":
+        return SQLiteIdempotencyStore()
+    return IdempotencyStore()
+
+# process-wide instance shared by the game endpoints
+idempotency_store = create_idempotency_store()
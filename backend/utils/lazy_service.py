@@ -0,0 +1,54 @@
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+class LazyService(Generic[T]):
+    """thread-safe lazily constructed singleton.
+
+    the factory runs on first use (or during warm-up), never at import time.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+        self.init_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.ready = False
+
+    def get(self) -> T:
+        """return the instance, constructing it on first call"""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    try:
+                        self._instance = self._factory()
+                        self.error = None
+                    except Exception as e:
+                        self.error = str(e)
+                        raise
+                    self.init_seconds = time.perf_counter() - started
+                    print(f"⚙️ {self.name} initialized in {self.init_seconds:.2f}s")
+        return self._instance
+
+    def warm_up(self) -> T:
+        """construct the instance and run its own warm_up hook if it has one"""
+        instance = self.get()
+        warm_up = getattr(instance, "warm_up", None)
+        if callable(warm_up):
+            try:
+                warm_up()
+            except Exception as e:
+                self.error = str(e)
+                raise
+        self.error = None
+        self.ready = True
+        return instance
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from utils.clients import get_openai_client
+from utils.call_policy import AttemptControl, CallDeadlineExceeded, call_policy
+from utils.rate_limiter import AcquireCancelled, rate_limiter
+from utils.token_counter import count_tokens
+from config import Config
+
+class ModelRouter:
+    """central model choice for every outbound model call, configured in Config.MODEL_ROUTES.
+
+    a route names the model of a call site, an optional small model for brief turns and a
+    fallback model used when the primary one times out. latency, tokens and cost are recorded
+    per (call site, model) route.
+    """
+
+    def __init__(self, latency_window: int = 500):
+        self._lock = threading.Lock()
+        self._latency_window = latency_window
+        self._routes: Dict[str, Dict[str, Any]] = {}
+
+    def get_route(self, call_site: str) -> Dict[str, Any]:
+        if call_site not in Config.MODEL_ROUTES:
+            raise ValueError(f"no model route for call site: {call_site}")
+        return Config.MODEL_ROUTES[call_site]
+
+    def select(self, call_site: str, brief: bool = False) -> str:
+        """model for a call site; brief turns (chit-chat, commands) use the small model if one is set"""
+        route = self.get_route(call_site)
+        if brief and route["small_model"]:
+            return route["small_model"]
+        return route["model"]
+
+    def complete(self, call_site: str, brief: bool = False, **kwargs) -> Any:
+        """chat completion on the routed model, falling back to the fallback model on timeout"""
+        prompt_text = "\n".join(str(message.get("content", "")) for message in kwargs.get("messages", []))
+        return self._with_fallback(
+            call_site,
+            self.select(call_site, brief),
+            lambda model, timeout: get_openai_client().chat.completions.create(model=model, timeout=timeout, **kwargs),
+            lambda model: count_tokens(prompt_text, model) + kwargs.get("max_tokens", 0)
+        )
+
+    def generate_image(self, call_site: str, **kwargs) -> Any:
+        """image generation on the routed model"""
+        return self._with_fallback(
+            call_site,
+            self.select(call_site),
+            lambda model, timeout: get_openai_client().images.generate(model=model, timeout=timeout, **kwargs),
+            lambda model: 0
+        )
+
+    def _with_fallback(self, call_site: str, model: str, request: Callable[[str, float], Any],
+                       estimate_tokens: Callable[[str], int]) -> Any:
+        route = self.get_route(call_site)
+        # one deadline for the call site: a fallback only gets what the primary model left of it
+        deadline = time.monotonic() + call_policy.get_policy(call_site)["deadline"]
+        try:
+            return self._call(call_site, model, route["timeout"], request, estimate_tokens, deadline)
+        except Exception as e:
+            fallback_model = route["fallback_model"]
+            if (not self._is_timeout(e) or isinstance(e, CallDeadlineExceeded)
+                    or not fallback_model or fallback_model == model or time.monotonic() >= deadline):
+                raise
+            print(f"⚠️ {call_site}: {model} timed out, falling back to {fallback_model} "
+                  f"({deadline - time.monotonic():.1f}s left)")
+            self._count(call_site, model, "fallbacks")
+            return self._call(call_site, fallback_model, route["timeout"], request, estimate_tokens, deadline)
+
+    def _call(self, call_site: str, model: str, timeout: float, request: Callable[[str, float], Any],
+              estimate_tokens: Callable[[str], int], deadline: Optional[float] = None) -> Any:
+        estimated_tokens = estimate_tokens(model)
+
+        def attempt(attempt_timeout: float, control: AttemptControl) -> Any:
+            # every attempt (retries and hedges included) waits for a rate-limit slot by priority,
+            # bounded by the attempt's share of the deadline
+            waited = rate_limiter.acquire(model, call_site, estimated_tokens, cancelled=control.cancelled,
+                                          timeout=attempt_timeout)
+            if control.cancelled.is_set():
+                # the other attempt of a hedge already won: hand the slot back unused
+                rate_limiter.release(model, estimated_tokens)
+                raise AcquireCancelled(f"{call_site}: hedge race already decided")
+            control.mark_started()
+            response = request(model, max(attempt_timeout - waited, 0.1))
+            rate_limiter.settle(model, estimated_tokens, self._total_tokens(getattr(response, "usage", None)))
+            return response
+
+        start = time.perf_counter()
+        try:
+            # deadline, retries and hedging are applied by the outbound call policy
+            response = call_policy.execute(call_site, attempt, timeout, deadline)
+        except Exception as e:
+            self._count(call_site, model, "timeouts" if self._is_timeout(e) else "errors")
+            raise
+        self._record(call_site, model, time.perf_counter() - start, getattr(response, "usage", None))
+        return response
+
+    def _total_tokens(self, usage: Any) -> Optional[int]:
+        if usage is None:
+            return None
+        total = getattr(usage, "total_tokens", None)
+        return total if isinstance(total, int) else None
+
+    def _is_timeout(self, error: Exception) -> bool:
+        return isinstance(error, TimeoutError) or type(error).__name__ in ("APITimeoutError", "ReadTimeout", "TimeoutException")
+
+    def _route_stats(self, call_site: str, model: str) -> Dict[str, Any]:
+        key = f"{call_site}:{model}"
+        if key not in self._routes:
+            self._routes[key] = {
+                "calls": 0, "errors": 0, "timeouts": 0, "fallbacks": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+                "latencies": deque(maxlen=self._latency_window)
+            }
+        return self._routes[key]
+
+    def _count(self, call_site: str, model: str, event: str):
+        with self._lock:
+            self._route_stats(call_site, model)[event] += 1
+
+    def _record(self, call_site: str, model: str, seconds: float, usage: Any):
+        # chat usage reports prompt/completion tokens, image usage reports input/output tokens
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+
+        input_price, cached_price, output_price = Config.MODEL_PRICES.get(model, (0.0, 0.0, 0.0))
+        cost = ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+                + completion_tokens * output_price) / 1_000_000
+
+        with self._lock:
+            stats = self._route_stats(call_site, model)
+            stats["calls"] += 1
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["cost_usd"] += cost
+            stats["latencies"].append(seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            report = {}
+            for key, stats in self._routes.items():
+                latencies = sorted(stats["latencies"])
+                report[key] = {
+                    **{name: value for name, value in stats.items() if name != "latencies"},
+                    "cost_usd": round(stats["cost_usd"], 6),
+                    "latency_avg_seconds": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+                    "latency_p50_seconds": round(latencies[len(latencies) // 2], 3) if latencies else 0.0,
+                    "latency_p95_seconds": round(latencies[int(len(latencies) * 0.95)], 3) if latencies else 0.0
+                }
+            return report
+
+# process-wide instance shared by all services
+model_router = ModelRouter()
@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from config import Config
+from utils.game_state import GameState
+from utils.session_store import SessionStore, SessionVersionConflict, create_session_store
+
+class _PlayerEntry:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.depth = 0    # nesting of session() in the thread holding the lock
+        self.version = 0  # store version the cached state was loaded at (0: not stored yet)
+
+class PlayerSessions:
+    """active game states, each guarded by its own re-entrant lock.
+
+    every mutation of a player's state (chat turns, stage advances, enemy status, background
+    extraction and summary merges) runs inside session(player_id), so requests for one player are
+    serialized while different players run in parallel. long model calls that do not touch the
+    state should run outside the session and apply their results inside it.
+
+    states live in a SessionStore (Config.SESSION_STORE). a session reloads the state if another
+    worker stored a newer version and, unless readonly, claims that version before the caller does
+    anything, so a turn's model calls and memory writes never run twice for one version. it waits
+    while another worker holds the claim and raises SessionVersionConflict if the claim is not
+    released in time. on exit the state is stored with a compare-and-set on the claimed version.
+    """
+
+    def __init__(self, store: Optional[SessionStore] = None):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _PlayerEntry] = {}
+        self._store = store
+        # lease owner of this process (threads of one process are serialized by the player locks)
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # this process's copies of the states; read-only outside this class (written by sessions and put())
+        self.games: Dict[str, GameState] = {}
+        self._stats = {
+            "acquisitions": 0, "contended": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0,
+            "reloads": 0, "saves": 0, "claim_waits": 0, "conflicts": 0
+        }
+
+    @property
+    def store(self) -> SessionStore:
+        """session store selected by Config.SESSION_STORE (created on first use)"""
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = create_session_store()
+        return self._store
+
+    def _entry(self, player_id: str) -> _PlayerEntry:
+        with self._lock:
+            if player_id not in self._entries:
+                self._entries[player_id] = _PlayerEntry()
+            return self._entries[player_id]
+
+    def lock(self, player_id: str) -> threading.RLock:
+        return self._entry(player_id).lock
+
+    @contextmanager
+    def session(self, player_id: str, readonly: bool = False) -> Iterator[Optional[GameState]]:
+        """hold the player's lock; yields the game state (None if there is no such game).
+        the outermost session of a thread loads the latest state and, unless readonly, stores it on exit."""
+        entry = self._entry(player_id)
+        waited = 0.0
+        if not entry.lock.acquire(blocking=False):
+            start = time.monotonic()
+            entry.lock.acquire()
+            waited = time.monotonic() - start
+        try:
+            self._record(waited)
+            outermost = entry.depth == 0
+            if outermost:
+                self._refresh(player_id, entry)
+                if not readonly:
+                    self._claim(player_id, entry)
+            entry.depth += 1
+            try:
+                yield self.games.get(player_id)
+            finally:
+                entry.depth -= 1
+                if outermost and not readonly:
+                    self._store_state(player_id, entry)
+        finally:
+            entry.lock.release()
+
+    def _refresh(self, player_id: str, entry: _PlayerEntry):
+        """reload the state if the stored version is not the one this process holds"""
+        stored_version = self.store.version(player_id)
+        if stored_version is None:
+            self.games.pop(player_id, None)
+            entry.version = 0
+        elif stored_version != entry.version or player_id not in self.games:
+            game_state, entry.version = self.store.load(player_id)
+            self.games[player_id] = game_state
+            self._count("reloads")
+
+    def _claim(self, player_id: str, entry: _PlayerEntry):
+        """lease the loaded version for this session, waiting while another worker holds it"""
+        give_up_at = time.monotonic() + Config.SESSION_CLAIM_TIMEOUT_SECONDS
+        waited = False
+        # version 0: not stored yet, the insert on save is the compare-and-set
+        while entry.version and not self.store.claim(player_id, entry.version, self._owner, Config.SESSION_LEASE_SECONDS):
+            if not waited:
+                waited = True
+                self._count("claim_waits")
+            if time.monotonic() >= give_up_at:
+                self._count("conflicts")
+                raise SessionVersionConflict(f"{player_id}: a turn is still running in another worker")
+            time.sleep(0.05)
+            self._refresh(player_id, entry)
+
+    def _store_state(self, player_id: str, entry: _PlayerEntry):
+        game_state = self.games.get(player_id)
+        if game_state is None:
+            if entry.version:
+                self.store.release(player_id, self._owner)
+            return
+        try:
+            version = self.store.save(player_id, game_state, entry.version, self._owner)
+        except SessionVersionConflict:
+            # drop this process's copy; the next session loads the winner's state
+            self._count("conflicts")
+            self.games.pop(player_id, None)
+            entry.version = 0
+            raise
+        if version != entry.version:
+            entry.version = version
+            self._count("saves")
+
+    def put(self, player_id: str, game_state: GameState):
+        """add or replace a player's game (new game, loaded game)"""
+        with self.session(player_id):
+            self.games[player_id] = game_state
+
+    def get(self, player_id: str) -> Optional[GameState]:
+        return self.games.get(player_id)
+
+    def __contains__(self, player_id: str) -> bool:
+        return player_id in self.games
+
+    def _count(self, event: str):
+        with self._lock:
+            self._stats[event] += 1
+
+    def _record(self, waited: float):
+        with self._lock:
+            self._stats["acquisitions"] += 1
+            if waited:
+                self._stats["contended"] += 1
+                self._stats["total_wait_seconds"] += waited
+                self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stored_games = self.store.count()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["active_games"] = len(self.games)
+            stats["stored_games"] = stored_games
+            stats["store"] = type(self._store).__name__
+            stats["avg_contended_wait_seconds"] = round(stats["total_wait_seconds"] / stats["contended"], 3) if stats["contended"] else 0.0
+            stats["total_wait_seconds"] = round(stats["total_wait_seconds"], 3)
+            stats["max_wait_seconds"] = round(stats["max_wait_seconds"], 3)
+            return stats
+
+# process-wide registry shared by the game manager and the background workers
+player_sessions = PlayerSessions()
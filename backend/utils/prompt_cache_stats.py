@@ -0,0 +1,43 @@
+import threading
+from typing import Any, Dict, Optional
+from config import Config
+
+class PromptCacheStats:
+    """aggregate cached-token ratios reported in OpenAI usage data, per call site.
+
+    callers that send a static prompt prefix also pass its size; calls whose prefix is shorter than
+    Config.PROMPT_CACHE_MIN_TOKENS cannot hit the provider cache and are counted separately.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sites: Dict[str, Dict[str, int]] = {}
+
+    def record(self, call_site: str, usage: Any, prefix_tokens: Optional[int] = None):
+        """record the usage object of a chat completion response (and the size of its static prefix)"""
+        if usage is None:
+            return
+
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+
+        with self._lock:
+            site = self._sites.setdefault(call_site, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+            site["calls"] += 1
+            site["prompt_tokens"] += prompt_tokens
+            site["cached_tokens"] += cached_tokens
+            if prefix_tokens is not None and prefix_tokens < Config.PROMPT_CACHE_MIN_TOKENS:
+                site["below_cache_minimum"] = site.get("below_cache_minimum", 0) + 1
+                site["min_prefix_tokens"] = min(site.get("min_prefix_tokens", prefix_tokens), prefix_tokens)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {}
+            for call_site, site in self._sites.items():
+                ratio = site["cached_tokens"] / site["prompt_tokens"] if site["prompt_tokens"] else 0.0
+                stats[call_site] = {**site, "cached_ratio": round(ratio, 3)}
+            return stats
+
+# process-wide instance shared by all services
+prompt_cache_stats = PromptCacheStats()
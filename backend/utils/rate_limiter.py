@@ -0,0 +1,171 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from config import Config
+
+class AcquireCancelled(Exception):
+    """the call gave up its place in the queue (e.g. a hedged attempt that lost the race)"""
+
+class RateLimitTimeout(TimeoutError):
+    """no rate-limit slot became free within the call's remaining time"""
+
+class TokenBucket:
+    """refills at limit/60 per second up to one minute of capacity; a limit of 0 means unlimited"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self._last = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._last) * self.rate)
+        self._last = now
+
+    def seconds_until(self, amount: float) -> float:
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        if not self.unlimited:
+            self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float):
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + amount)
+
+class RateLimiter:
+    """per-model RPM/TPM token buckets with a priority queue in front of them.
+
+    every outbound model call waits here for a request slot and its estimated tokens. when a
+    model is saturated, waiters are served by priority (Config.CALL_PRIORITIES: interactive chat
+    first, then stage intros, then map generation and background work), FIFO within a priority.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+        self._queues: Dict[str, List[Tuple[int, int]]] = {}
+        self._max_depth: Dict[str, int] = {}
+        self._waits: Dict[str, Dict[str, float]] = {}
+
+    def _get_buckets(self, model: str) -> Optional[Tuple[TokenBucket, TokenBucket]]:
+        limits = Config.MODEL_RATE_LIMITS.get(model)
+        if not limits:
+            return None
+        if model not in self._buckets:
+            rpm, tpm = limits
+            self._buckets[model] = (TokenBucket(rpm), TokenBucket(tpm))
+        return self._buckets[model]
+
+    def acquire(self, model: str, call_site: str, tokens: int = 0, cancelled: Optional[threading.Event] = None,
+                timeout: Optional[float] = None) -> float:
+        """block until the model has a request slot and `tokens` tokens for this call; returns the wait.
+        raises AcquireCancelled if `cancelled` is set while waiting, RateLimitTimeout after `timeout` seconds."""
+        start = time.monotonic()
+        give_up_at = start + timeout if timeout is not None else float("inf")
+        priority = Config.CALL_PRIORITIES.get(call_site, Config.CALL_PRIORITIES["default"])
+
+        with self._cond:
+            buckets = self._get_buckets(model)
+            if buckets is not None:
+                requests, token_bucket = buckets
+                entry = (priority, next(self._seq))
+                queue = self._queues.setdefault(model, [])
+                heapq.heappush(queue, entry)
+                self._max_depth[model] = max(self._max_depth.get(model, 0), len(queue))
+                try:
+                    while True:
+                        if cancelled is not None and cancelled.is_set():
+                            raise AcquireCancelled(f"{call_site}: cancelled while waiting for {model}")
+                        remaining = give_up_at - time.monotonic()
+                        if queue[0] == entry:
+                            wait_seconds = max(requests.seconds_until(1), token_bucket.seconds_until(tokens))
+                            if wait_seconds <= 0:
+                                requests.take(1)
+                                token_bucket.take(tokens)
+                                break
+                            if wait_seconds > remaining:
+                                raise RateLimitTimeout(f"{call_site}: no {model} slot within {timeout:.1f}s")
+                            self._cond.wait(timeout=min(wait_seconds, 0.5))
+                        else:
+                            if remaining <= 0:
+                                raise RateLimitTimeout(f"{call_site}: no {model} slot within {timeout:.1f}s")
+                            # a higher-priority or earlier waiter goes first
+                            self._cond.wait(timeout=min(remaining, 0.5))
+                finally:
+                    queue.remove(entry)
+                    heapq.heapify(queue)
+                    self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            self._record_wait(call_site, waited)
+        return waited
+
+    def release(self, model: str, tokens: int = 0):
+        """return the request slot and tokens of a call that was acquired but never sent"""
+        with self._cond:
+            buckets = self._buckets.get(model)
+            if buckets is None:
+                return
+            buckets[0].give_back(1)
+            buckets[1].give_back(tokens)
+            self._cond.notify_all()
+
+    def settle(self, model: str, estimated_tokens: int, actual_tokens: Optional[int]):
+        """return over-estimated tokens to the TPM bucket (or charge the shortfall)"""
+        if actual_tokens is None:
+            return
+        with self._cond:
+            buckets = self._buckets.get(model)
+            if buckets is None:
+                return
+            difference = estimated_tokens - actual_tokens
+            if difference > 0:
+                buckets[1].give_back(difference)
+            else:
+                buckets[1].take(-difference)
+            self._cond.notify_all()
+
+    def _record_wait(self, call_site: str, waited: float):
+        stats = self._waits.setdefault(call_site, {"calls": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0})
+        stats["calls"] += 1
+        stats["total_wait_seconds"] += waited
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            models = {}
+            for model, (requests, token_bucket) in self._buckets.items():
+                requests.seconds_until(0)
+                token_bucket.seconds_until(0)
+                models[model] = {
+                    "queue_depth": len(self._queues.get(model, [])),
+                    "max_queue_depth": self._max_depth.get(model, 0),
+                    "requests_available": None if requests.unlimited else round(requests.level, 1),
+                    "tokens_available": None if token_bucket.unlimited else round(token_bucket.level)
+                }
+            call_sites = {
+                call_site: {
+                    "calls": stats["calls"],
+                    "priority": Config.CALL_PRIORITIES.get(call_site, Config.CALL_PRIORITIES["default"]),
+                    "avg_wait_seconds": round(stats["total_wait_seconds"] / stats["calls"], 3),
+                    "max_wait_seconds": round(stats["max_wait_seconds"], 3)
+                }
+                for call_site, stats in self._waits.items()
+            }
+            return {"models": models, "call_sites": call_sites}
+
+# process-wide instance shared by all outbound model calls
+rate_limiter = RateLimiter()
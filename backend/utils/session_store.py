@@ -0,0 +1,205 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+from config import Config
+from utils.game_state import GameState
+
+class SessionVersionConflict(Exception):
+    """the game state was changed by another worker since it was loaded"""
+
+class SessionStore(ABC):
+    """versioned storage of game states.
+
+    save() is a compare-and-set on the version: it succeeds only if the stored version is still
+    the one the state was loaded at (0 for a new game), so concurrent writers never overwrite
+    each other silently. claim() takes a lease on a stored version before a turn starts, so a
+    second worker finds out before it makes any model call or memory write, not at save().
+    """
+
+    @abstractmethod
+    def version(self, player_id: str) -> Optional[int]:
+        """current version of a player's state (None if there is no such game)"""
+
+    @abstractmethod
+    def load(self, player_id: str) -> Optional[Tuple[GameState, int]]:
+        """latest state and its version (None if there is no such game)"""
+
+    @abstractmethod
+    def claim(self, player_id: str, version: int, owner: str, lease_seconds: float) -> bool:
+        """lease the state at `version` to owner; False if it changed or another owner holds a live lease"""
+
+    @abstractmethod
+    def save(self, player_id: str, game_state: GameState, expected_version: int, owner: Optional[str] = None) -> int:
+        """store the state if the stored version is expected_version (and not leased to another owner);
+        releases owner's lease and returns the new version"""
+
+    @abstractmethod
+    def release(self, player_id: str, owner: str):
+        """drop owner's lease without storing"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """number of stored games"""
+
+class InMemorySessionStore(SessionStore):
+    """states of this process only (single worker); objects are kept as they are, without serialization"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: Dict[str, Tuple[GameState, int]] = {}
+        self._leases: Dict[str, Tuple[str, float]] = {}
+
+    def version(self, player_id: str) -> Optional[int]:
+        record = self._states.get(player_id)
+        return record[1] if record else None
+
+    def load(self, player_id: str) -> Optional[Tuple[GameState, int]]:
+        return self._states.get(player_id)
+
+    def claim(self, player_id: str, version: int, owner: str, lease_seconds: float) -> bool:
+        with self._lock:
+            if self.version(player_id) != version or self._leased_to_other(player_id, owner):
+                return False
+            self._leases[player_id] = (owner, time.monotonic() + lease_seconds)
+            return True
+
+    def save(self, player_id: str, game_state: GameState, expected_version: int, owner: Optional[str] = None) -> int:
+        with self._lock:
+            record = self._states.get(player_id)
+            current_version = record[1] if record else 0
+            if current_version != expected_version or self._leased_to_other(player_id, owner):
+                raise SessionVersionConflict(f"{player_id}: version {current_version}, expected {expected_version}")
+            self._states[player_id] = (game_state, current_version + 1)
+            self._leases.pop(player_id, None)
+            return current_version + 1
+
+    def release(self, player_id: str, owner: str):
+        with self._lock:
+            if not self._leased_to_other(player_id, owner):
+                self._leases.pop(player_id, None)
+
+    def _leased_to_other(self, player_id: str, owner: Optional[str]) -> bool:
+        lease = self._leases.get(player_id)
+        return lease is not None and lease[0] != owner and lease[1] > time.monotonic()
+
+    def count(self) -> int:
+        return len(self._states)
+
+class SQLiteSessionStore(SessionStore):
+    """states shared by all worker processes on the host (SQLite in WAL mode)"""
+
+    # the row is not leased, leased to the caller, or the lease expired (parameters: owner, now)
+    _FREE = "(owner IS NULL OR owner = ? OR lease_until < ?)"
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or Config.SESSION_DB_PATH
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # one connection per process, guarded by a lock (handlers run in worker threads)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                player_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                state TEXT NOT NULL,
+                owner TEXT,
+                lease_until REAL
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+        for column, column_type in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:  # database created before leases
+                self._conn.execute(f"ALTER TABLE sessions ADD COLUMN {column} {column_type}")
+        self._conn.commit()
+        # digest of the state last read or written per player, to skip writes of unchanged states
+        self._digests: Dict[str, Tuple[int, bytes]] = {}
+
+    def version(self, player_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM sessions WHERE player_id = ?", (player_id,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, player_id: str) -> Optional[Tuple[GameState, int]]:
+        with self._lock:
+            row = self._conn.execute("SELECT state, version FROM sessions WHERE player_id = ?", (player_id,)).fetchone()
+            if not row:
+                return None
+            state_json, version = row
+            self._digests[player_id] = (version, self._digest(state_json))
+        return GameState.parse_raw(state_json), version
+
+    def claim(self, player_id: str, version: int, owner: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE sessions SET owner = ?, lease_until = ? WHERE player_id = ? AND version = ? AND {self._FREE}",
+                (owner, now + lease_seconds, player_id, version, owner, now)
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def save(self, player_id: str, game_state: GameState, expected_version: int, owner: Optional[str] = None) -> int:
+        state_json = game_state.json()
+        digest = self._digest(state_json)
+        with self._lock:
+            if self._digests.get(player_id) == (expected_version, digest):
+                # unchanged since it was loaded
+                if owner is not None:
+                    self._release(player_id, owner)
+                return expected_version
+
+            if expected_version == 0:
+                cursor = self._conn.execute(
+                    "INSERT INTO sessions (player_id, version, updated_at, state) VALUES (?, 1, ?, ?) "
+                    "ON CONFLICT(player_id) DO NOTHING",
+                    (player_id, time.time(), state_json)
+                )
+            else:
+                now = time.time()
+                cursor = self._conn.execute(
+                    "UPDATE sessions SET version = version + 1, updated_at = ?, state = ?, owner = NULL, lease_until = NULL "
+                    f"WHERE player_id = ? AND version = ? AND {self._FREE}",
+                    (now, state_json, player_id, expected_version, owner, now)
+                )
+            self._conn.commit()
+
+            if cursor.rowcount == 0:
+                self._digests.pop(player_id, None)
+                raise SessionVersionConflict(f"{player_id}: changed by another worker since version {expected_version}")
+            self._digests[player_id] = (expected_version + 1, digest)
+        return expected_version + 1
+
+    def release(self, player_id: str, owner: str):
+        with self._lock:
+            self._release(player_id, owner)
+
+    def _release(self, player_id: str, owner: str):
+        self._conn.execute("UPDATE sessions SET owner = NULL, lease_until = NULL WHERE player_id = ? AND owner = ?",
+                           (player_id, owner))
+        self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def _digest(self, state_json: str) -> bytes:
+        return hashlib.blake2b(state_json.encode("utf-8"), digest_size=16).digest()
+
+def create_session_store() -> SessionStore:
+    """session store selected by Config.SESSION_STORE"""
+    if Config.SESSION_STORE == "sqlite":
+        return SQLiteSessionStore()
+    if Config.SESSION_STORE == "memory":
+        return InMemorySessionStore()
+    raise ValueError(f"unknown SESSION_STORE: {Config.SESSION_STORE} (use 'memory' or 'sqlite')")
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Optional
+
+def request_key(*parts: Any) -> str:
+    """canonical hash of a request (order-stable JSON of its parts)"""
+    canonical = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """coalesce concurrent identical calls: duplicates wait for the in-flight execution and share
+    its result (or its exception). nothing is cached once the execution finishes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def run(self, namespace: str, key: str, fn: Callable[[], Any]) -> Any:
+        flight_key = f"{namespace}:{key}"
+        with self._lock:
+            stats = self._stats.setdefault(namespace, {"executions": 0, "coalesced": 0})
+            flight = self._flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[flight_key] = _Flight()
+                stats["executions"] += 1
+            else:
+                stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[flight_key]
+            flight.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                namespace: {**stats, "in_flight": sum(1 for key in self._flights if key.startswith(f"{namespace}:"))}
+                for namespace, stats in self._stats.items()
+            }
+
+# process-wide instance shared by all services
+single_flight = SingleFlight()
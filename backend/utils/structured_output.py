@@ -0,0 +1,124 @@
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union, get_args, get_origin, get_type_hints
+from utils.game_state import PlayerInfo, Stage
+
+# PlayerInfo fields the extraction of each stage may fill (stages 4-8 share the last set)
+STAGE_EXTRACTION_FIELDS = {
+    Stage.TUTORIAL: ["name", "age", "location", "occupation", "personality_traits", "likes", "life_goal", "extra_info"],
+    Stage.STAGE_2: ["fears", "personality_traits", "likes", "extra_info"],
+    Stage.STAGE_3: ["background", "personality_traits", "likes", "extra_info"],
+}
+LATER_STAGE_EXTRACTION_FIELDS = ["personality_traits", "likes", "fears", "background", "extra_info"]
+
+def extraction_fields(stage: Stage) -> List[str]:
+    """PlayerInfo fields extracted in a stage"""
+    return STAGE_EXTRACTION_FIELDS.get(stage, LATER_STAGE_EXTRACTION_FIELDS)
+
+def _base_type(annotation: Any) -> Any:
+    """Optional[int] -> int, List[str] -> list"""
+    if get_origin(annotation) is Union:
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+    return get_origin(annotation) or annotation
+
+def _field_types(fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    hints = get_type_hints(PlayerInfo)
+    return {field: _base_type(hints[field]) for field in (fields or list(hints))}
+
+def player_info_schema(fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """strict JSON schema of a PlayerInfo delta: every field present, null when not mentioned"""
+    properties = {}
+    for field, field_type in _field_types(fields).items():
+        if field_type is list:
+            properties[field] = {"type": ["array", "null"], "items": {"type": "string"}}
+        elif field_type is int:
+            properties[field] = {"type": ["integer", "null"]}
+        else:
+            properties[field] = {"type": ["string", "null"]}
+
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+def validate_player_info(raw: Any, fields: Optional[List[str]] = None) -> Tuple[Dict[str, Any], List[str]]:
+    """normalize a PlayerInfo delta to the field types (age as int, lists as arrays of strings).
+    returns (valid non-empty fields, names of fields whose values could not be used)."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"expected a JSON object, got {type(raw).__name__}")
+
+    info: Dict[str, Any] = {}
+    invalid: List[str] = []
+    for field, field_type in _field_types(fields).items():
+        value = raw.get(field)
+        if value is None or value == "" or value == []:
+            continue
+
+        if field_type is int:
+            value = _to_int(value)
+            if value is None or not 1 <= value <= 120:
+                invalid.append(field)
+                continue
+        elif field_type is list:
+            if isinstance(value, str):
+                value = value.split(",")
+            if not isinstance(value, list):
+                invalid.append(field)
+                continue
+            value = [str(item).strip() for item in value if item is not None and str(item).strip()]
+            if not value:
+                continue
+        else:
+            if isinstance(value, list):
+                value = ", ".join(str(item) for item in value)
+            if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+                invalid.append(field)
+                continue
+            value = str(value).strip()
+            if not value:
+                continue
+
+        info[field] = value
+
+    return info, invalid
+
+def _to_int(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        match = re.search(r"\d+", value)
+        return int(match.group(0)) if match else None
+    return None
+
+class StructuredOutputStats:
+    """parse-failure and retry rates of structured-output calls, per call site"""
+
+    EVENTS = ("requests", "attempts", "parse_failures", "retries", "invalid_fields", "failures")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sites: Dict[str, Dict[str, int]] = {}
+
+    def record(self, call_site: str, event: str, count: int = 1):
+        with self._lock:
+            site = self._sites.setdefault(call_site, {name: 0 for name in self.EVENTS})
+            site[event] += count
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {}
+            for call_site, site in self._sites.items():
+                stats[call_site] = {
+                    **site,
+                    "parse_failure_rate": round(site["parse_failures"] / site["attempts"], 3) if site["attempts"] else 0.0,
+                    "retry_rate": round(site["retries"] / site["requests"], 3) if site["requests"] else 0.0,
+                    "failure_rate": round(site["failures"] / site["requests"], 3) if site["requests"] else 0.0
+                }
+            return stats
+
+# process-wide instance shared by all services
+structured_output_stats = StructuredOutputStats()
@@ -0,0 +1,30 @@
+from functools import lru_cache
+from typing import Optional
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    """tiktoken encoding for a model, or None if it cannot be loaded"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            # model names unknown to the installed tiktoken use the gpt-4o family encoding
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # the BPE file is downloaded on first use; without it fall back to the estimate
+        print(f"⚠️ tiktoken encoding unavailable for {model}, estimating tokens: {e}")
+        return None
+
+def count_tokens(text: str, model: Optional[str] = "gpt-4o") -> int:
+    """count tokens locally (no API call); falls back to ~4 characters per token"""
+    if not text:
+        return 0
+    encoding = _get_encoding(model or "gpt-4o")
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
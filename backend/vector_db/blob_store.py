@@ -0,0 +1,169 @@
+import sqlite3
+import threading
+import os
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from config import Config
+from vector_db.quantization import quantize_int8, dequantize_int8
+
+class BlobStore:
+    """local key-value store for full texts and state blobs.
+
+    vectors only carry ids and filterable fields in their metadata.
+    the payloads they point to live here and are fetched on demand.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or Config.LOCAL_STORE_PATH
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # one shared connection, guarded by a lock (FastAPI handlers may run in worker threads)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                id TEXT PRIMARY KEY,
+                player_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                body TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_player ON blobs (player_id, created_at)")
+        # int8-quantized copies of indexed vectors, used for local re-ranking
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                id TEXT PRIMARY KEY,
+                player_id TEXT NOT NULL,
+                codes BLOB NOT NULL,
+                scale REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_vectors_player ON vectors (player_id)")
+        # completion markers used by the compactor
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS player_status (
+                player_id TEXT PRIMARY KEY,
+                completed_at REAL
+            )
+        """)
+        self._conn.commit()
+
+    def put(self, blob_id: str, player_id: str, kind: str, body: str):
+        """store (or replace) a text blob"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blobs (id, player_id, kind, created_at, body) VALUES (?, ?, ?, ?, ?)",
+                (blob_id, player_id, kind, time.time(), body)
+            )
+            self._conn.commit()
+
+    def get(self, blob_id: str) -> Optional[str]:
+        """return a single blob body"""
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM blobs WHERE id = ?", (blob_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, blob_ids: List[str]) -> Dict[str, str]:
+        """return blob bodies for the given ids (missing ids are skipped)"""
+        if not blob_ids:
+            return {}
+
+        placeholders = ",".join("?" for _ in blob_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, body FROM blobs WHERE id IN ({placeholders})",
+                list(blob_ids)
+            ).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def get_latest(self, player_id: str, kind: str) -> Optional[str]:
+        """return the most recent blob of a kind for a player"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM blobs WHERE player_id = ? AND kind = ? ORDER BY created_at DESC LIMIT 1",
+                (player_id, kind)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_vector(self, vector_id: str, player_id: str, values: List[float]):
+        """store an int8-quantized copy of a vector"""
+        codes, scales = quantize_int8(values)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO vectors (id, player_id, codes, scale) VALUES (?, ?, ?, ?)",
+                (vector_id, player_id, codes[0].tobytes(), float(scales[0]))
+            )
+            self._conn.commit()
+
+    def get_vectors(self, vector_ids: List[str]) -> Dict[str, np.ndarray]:
+        """return dequantized float32 vectors for the given ids (missing ids are skipped)"""
+        if not vector_ids:
+            return {}
+
+        placeholders = ",".join("?" for _ in vector_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, codes, scale FROM vectors WHERE id IN ({placeholders})",
+                list(vector_ids)
+            ).fetchall()
+
+        vectors = {}
+        for vector_id, codes, scale in rows:
+            restored = dequantize_int8(np.frombuffer(codes, dtype=np.int8)[None, :], np.array([scale]))
+            vectors[vector_id] = restored[0]
+        return vectors
+
+    def get_player_bodies(self, player_id: str, kind: str) -> List[str]:
+        """return all blob bodies of a kind for a player, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT body FROM blobs WHERE player_id = ? AND kind = ? ORDER BY created_at",
+                (player_id, kind)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def ids_for_player(self, player_id: str) -> List[str]:
+        """return all blob ids owned by a player"""
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM blobs WHERE player_id = ?", (player_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def mark_completed(self, player_id: str):
+        """record that a player's game is completed"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO player_status (player_id, completed_at) VALUES (?, ?)",
+                (player_id, time.time())
+            )
+            self._conn.commit()
+
+    def list_players(self, exclude_kinds: Optional[List[str]] = None) -> List[Dict]:
+        """return each player's last write time and completion time"""
+        exclude_kinds = exclude_kinds or []
+        placeholders = ",".join("?" for _ in exclude_kinds) or "''"
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT b.player_id, MAX(b.created_at), s.completed_at
+                FROM blobs b LEFT JOIN player_status s ON s.player_id = b.player_id
+                WHERE b.kind NOT IN ({placeholders})
+                GROUP BY b.player_id
+                """,
+                list(exclude_kinds)
+            ).fetchall()
+        return [{"player_id": row[0], "last_activity": row[1], "completed_at": row[2]} for row in rows]
+
+    def delete_player(self, player_id: str) -> int:
+        """delete all blobs of a player and return how many were removed"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM blobs WHERE player_id = ?", (player_id,))
+            self._conn.execute("DELETE FROM vectors WHERE player_id = ?", (player_id,))
+            self._conn.execute("DELETE FROM player_status WHERE player_id = ?", (player_id,))
+            self._conn.commit()
+        return cursor.rowcount
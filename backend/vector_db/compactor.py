@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from vector_db.vector_store import VectorStore
+from config import Config
+
+class VectorCompactor:
+    """expire vectors of completed or idle games after a TTL.
+
+    runs periodically in a background thread. a purged player can optionally keep one
+    summary vector built from its stage summaries (or its own messages as a fallback).
+    """
+
+    def __init__(self, get_vector_store: Callable[[], VectorStore]):
+        self._get_vector_store = get_vector_store
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_report: Optional[Dict[str, Any]] = None
+        self.totals = {"runs": 0, "players_compacted": 0, "vectors_reclaimed": 0, "summaries_written": 0}
+
+    def start(self):
+        """start the periodic compaction thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="vector-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _loop(self):
+        while not self._stop_event.wait(Config.COMPACTOR_INTERVAL_SECONDS):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"⚠️ vector compaction failed: {e}")
+
+    def run_once(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """compact every expired player once and return a report"""
+        now = time.time() if now is None else now
+        vector_store = self._get_vector_store()
+        report = {"players_compacted": 0, "vectors_reclaimed": 0, "summaries_written": 0}
+
+        for player in vector_store.blob_store.list_players(exclude_kinds=["player_summary"]):
+            if not self._is_expired(player, now):
+                continue
+
+            player_id = player["player_id"]
+            summary_text = self._build_summary_text(vector_store, player_id) if Config.COMPACT_TO_SUMMARY else ""
+
+            deleted = vector_store.delete_player_data(player_id)
+            report["players_compacted"] += 1
+            report["vectors_reclaimed"] += deleted
+
+            if summary_text:
+                vector_store.add_player_summary(player_id, summary_text)
+                report["summaries_written"] += 1
+                report["vectors_reclaimed"] -= 1  # the summary vector replaces one of them
+
+        report["finished_at"] = datetime.fromtimestamp(now).isoformat()
+        self.last_report = report
+        self.totals["runs"] += 1
+        for key in ("players_compacted", "vectors_reclaimed", "summaries_written"):
+            self.totals[key] += report[key]
+
+        print(f"🧹 vector compaction: {report}")
+        return report
+
+    def _is_expired(self, player: Dict[str, Any], now: float) -> bool:
+        if player["completed_at"] and now - player["completed_at"] > Config.VECTOR_COMPLETED_TTL_SECONDS:
+            return True
+        return now - player["last_activity"] > Config.VECTOR_IDLE_TTL_SECONDS
+
+    def _build_summary_text(self, vector_store: VectorStore, player_id: str) -> str:
+        """one text describing the player: saved stage summaries, else their own messages"""
+        saved_state = vector_store.load_game_state(player_id)
+        if saved_state:
+            state = json.loads(saved_state)
+            summaries = state.get("stage_summaries") or {}
+            player_info = state.get("player_info") or {}
+            parts = [f"player info: {player_info}"] if player_info else []
+            parts += [f"stage {stage}: {summary}" for stage, summary in sorted(summaries.items()) if summary]
+            if parts:
+                return "\n".join(parts)[:Config.COMPACT_SUMMARY_MAX_CHARS]
+
+        player_turns = [
+            text for text in vector_store.blob_store.get_player_bodies(player_id, "conversation")
+            if text.startswith("player: ")
+        ]
+        return " | ".join(player_turns)[:Config.COMPACT_SUMMARY_MAX_CHARS]
@@ -0,0 +1,93 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional
+from config import Config
+
+class EmbeddingProvider(ABC):
+    """interface for text embedding backends used by VectorStore"""
+
+    name = "base"
+    dimension = 0
+
+    @abstractmethod
+    def embed_query(self, text: str) -> List[float]:
+        """embedding of one text"""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings through langchain (one network round trip per call).
+    with a text-embedding-3 model the dimension can be reduced (e.g. 256 or 512)."""
+
+    name = "openai"
+
+    def __init__(self, dimension: int = 1536):
+        from langchain_openai import OpenAIEmbeddings
+        self.dimension = dimension
+        self.model = Config.EMBEDDING_MODEL
+
+        if self.model.startswith("text-embedding-3"):
+            # text-embedding-3 models return shortened vectors natively via the dimensions parameter
+            self._embeddings = OpenAIEmbeddings(
+                openai_api_key=Config.OPENAI_API_KEY,
+                model=self.model,
+                dimensions=dimension
+            )
+        elif dimension != 1536:
+            raise ValueError(f"{self.model} only produces 1536-dim vectors; use a text-embedding-3 model for {dimension} dimensions")
+        else:
+            self._embeddings = OpenAIEmbeddings(openai_api_key=Config.OPENAI_API_KEY, model=self.model)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embeddings.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embeddings.embed_documents(texts)
+
+class LocalHashingEmbeddingProvider(EmbeddingProvider):
+    """CPU-only embeddings: hashed character n-grams, signed and L2-normalized.
+
+    no model download and no network call; a turn embeds in well under a millisecond.
+    quality is lexical rather than semantic, which suits short chat turns.
+    """
+
+    name = "local"
+
+    def __init__(self, dimension: int = 384):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        self.dimension = dimension
+        self._vectorizer = HashingVectorizer(
+            n_features=dimension,
+            analyzer="char_wb",
+            ngram_range=(3, 5),
+            alternate_sign=True,
+            norm="l2",
+            lowercase=True
+        )
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._vectorizer.transform(texts).toarray().tolist()
+
+# provider name -> (class, default dimension)
+EMBEDDING_PROVIDERS = {
+    "openai": (OpenAIEmbeddingProvider, 1536),
+    "local": (LocalHashingEmbeddingProvider, 384),
+}
+
+def get_embedding_dimension(provider_name: Optional[str] = None) -> int:
+    """configured dimension for a provider (EMBEDDING_DIMENSION overrides the provider default)"""
+    provider_name = provider_name or Config.EMBEDDING_PROVIDER
+    if provider_name not in EMBEDDING_PROVIDERS:
+        raise ValueError(f"unknown embedding provider: {provider_name}")
+    return Config.EMBEDDING_DIMENSION or EMBEDDING_PROVIDERS[provider_name][1]
+
+def create_embedding_provider(provider_name: Optional[str] = None) -> EmbeddingProvider:
+    """create the configured embedding provider"""
+    provider_name = provider_name or Config.EMBEDDING_PROVIDER
+    provider_class, _ = EMBEDDING_PROVIDERS.get(provider_name, (None, None))
+    if provider_class is None:
+        raise ValueError(f"unknown embedding provider: {provider_name}")
+    return provider_class(dimension=get_embedding_dimension(provider_name))
@@ -0,0 +1,83 @@
+import re
+import threading
+from typing import Any, Dict, List, Optional
+from vector_db.vector_store import VectorStore
+from config import Config
+
+class HybridRetriever:
+    """merge lexical (FTS5) and vector hits for a player's past turns.
+
+    if the names in the message (capitalized words such as "Seoul") all match lexically, those
+    hits are returned as-is, so exact-fact recall never pays for an embedding call. otherwise
+    lexical and MMR-ranked vector hits are merged with reciprocal rank fusion.
+    """
+
+    def __init__(self, vector_store: VectorStore):
+        self.vector_store = vector_store
+        self.lexical_index = vector_store.lexical_index
+        self._lock = threading.Lock()
+        self.stats = {"lexical_only": 0, "hybrid": 0, "vector_errors": 0}
+
+    def retrieve(self, query: str, player_id: str, top_k: Optional[int] = None,
+                 exclude_texts: Optional[List[str]] = None) -> List[Dict]:
+        """return a small set of relevant past turns in chronological order"""
+        top_k = top_k or Config.RETRIEVAL_TOP_K
+        exclude_texts = set(exclude_texts or [])
+
+        # 1. exact-fact path: the names in the message (or all its terms) are found lexically
+        exact_query = " ".join(self._entity_terms(query)) or query
+        exact_hits = self._filter(self.lexical_index.search(player_id, exact_query, limit=top_k, match_all=True), exclude_texts)
+        if exact_hits:
+            self._count("lexical_only")
+            return self._chronological(exact_hits)
+
+        # 2. hybrid path: any-term lexical hits + vector hits
+        self._count("hybrid")
+        lexical_hits = self._filter(self.lexical_index.search(player_id, query, limit=Config.RETRIEVAL_FETCH_K), exclude_texts)
+        try:
+            vector_hits = self.vector_store.retrieve_relevant_context(query, player_id, top_k=top_k, exclude_texts=list(exclude_texts))
+        except Exception as e:
+            print(f"⚠️ vector retrieval failed, using lexical hits only: {e}")
+            self._count("vector_errors")
+            vector_hits = []
+
+        return self._chronological(self._reciprocal_rank_fusion([lexical_hits, vector_hits], top_k))
+
+    def _count(self, event: str):
+        with self._lock:
+            self.stats[event] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats)
+
+    def _entity_terms(self, text: str) -> List[str]:
+        """proper-noun-like words: capitalized and not at the start of a sentence"""
+        entities = []
+        for match in re.finditer(r"\b[A-Z][\w'-]*", text):
+            before = text[:match.start()].rstrip()
+            at_sentence_start = not before or before[-1] in ".!?\n"
+            word = match.group(0)
+            if at_sentence_start or word in ("I", "I'm", "I've", "I'll", "I'd"):
+                continue
+            entities.extend(self.lexical_index.extract_terms(word))
+        return entities
+
+    def _reciprocal_rank_fusion(self, ranked_lists: List[List[Dict]], top_k: int, k: int = 60) -> List[Dict]:
+        """merge ranked lists by sum of 1 / (k + rank), deduplicating by content"""
+        scores: Dict[str, float] = {}
+        items: Dict[str, Dict] = {}
+        for ranked in ranked_lists:
+            for rank, item in enumerate(ranked):
+                key = item["content"]
+                scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+                items.setdefault(key, item)
+
+        best = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        return [items[key] for key in best]
+
+    def _filter(self, hits: List[Dict], exclude_texts: set) -> List[Dict]:
+        return [hit for hit in hits if hit["content"] not in exclude_texts]
+
+    def _chronological(self, hits: List[Dict]) -> List[Dict]:
+        return sorted(hits, key=lambda x: x["metadata"].get("ts", 0))
@@ -0,0 +1,100 @@
+import sqlite3
+import threading
+import os
+import re
+from typing import Dict, List, Optional
+from config import Config
+
+# words that carry no recall value on their own
+STOPWORDS = {
+    "a", "an", "the", "i", "im", "me", "my", "mine", "you", "your", "we", "our", "he", "she", "it", "its",
+    "they", "them", "is", "am", "are", "was", "were", "be", "been", "do", "does", "did", "have", "has", "had",
+    "and", "or", "but", "so", "to", "of", "in", "on", "at", "for", "with", "about", "from", "by", "as",
+    "what", "who", "where", "when", "why", "how", "that", "this", "there", "here", "not", "no", "yes",
+    "can", "could", "would", "should", "will", "just", "like", "really", "very", "too", "also", "s", "t"
+}
+
+class LexicalIndex:
+    """SQLite FTS5 full-text index over each player's conversation turns.
+
+    exact names and places ("Seoul", a pet's name) are matched lexically, without any embedding call.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or Config.LOCAL_STORE_PATH
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS conversation_fts USING fts5(
+                doc_id UNINDEXED,
+                player_id UNINDEXED,
+                speaker UNINDEXED,
+                ts UNINDEXED,
+                text,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+        self._conn.commit()
+
+    def add(self, doc_id: str, player_id: str, speaker: str, ts: float, text: str):
+        """index one conversation turn"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO conversation_fts (doc_id, player_id, speaker, ts, text) VALUES (?, ?, ?, ?, ?)",
+                (doc_id, player_id, speaker, ts, text)
+            )
+            self._conn.commit()
+
+    def search(self, player_id: str, query: str, limit: int = 5, match_all: bool = False) -> List[Dict]:
+        """bm25-ranked search over a player's turns.
+        match_all requires every content term of the query to appear in the turn."""
+        terms = self.extract_terms(query)
+        if not terms:
+            return []
+
+        operator = " AND " if match_all else " OR "
+        match_expression = operator.join(f'"{term}"' for term in terms)
+
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT doc_id, speaker, ts, text, bm25(conversation_fts) AS rank
+                FROM conversation_fts
+                WHERE conversation_fts MATCH ? AND player_id = ?
+                ORDER BY rank
+                LIMIT ?
+                """,
+                (match_expression, player_id, limit)
+            ).fetchall()
+
+        return [
+            {
+                "id": row[0],
+                "content": row[3],
+                "metadata": {"player_id": player_id, "type": "conversation", "speaker": row[1], "ts": float(row[2])},
+                "score": -row[4]  # bm25() is lower-is-better
+            }
+            for row in rows
+        ]
+
+    def delete_player(self, player_id: str) -> int:
+        """remove all indexed turns of a player"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM conversation_fts WHERE player_id = ?", (player_id,))
+            self._conn.commit()
+        return cursor.rowcount
+
+    @staticmethod
+    def extract_terms(text: str) -> List[str]:
+        """content terms of a text, lowercased, stopwords removed, order preserved"""
+        terms = []
+        for word in re.findall(r"\w+", text.lower()):
+            if word not in STOPWORDS and word not in terms:
+                terms.append(word)
+        return terms
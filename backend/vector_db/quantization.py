@@ -0,0 +1,21 @@
+from typing import Sequence, Tuple
+import numpy as np
+
+def quantize_int8(vectors: Sequence[Sequence[float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """symmetric per-vector int8 scalar quantization.
+
+    each vector is scaled so that its largest absolute component maps to 127.
+    returns (codes int8 [n, d], scales float32 [n]); storage is d + 4 bytes per vector instead of 4d.
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+
+    scales = np.max(np.abs(matrix), axis=1) / 127.0
+    scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """restore float32 vectors from int8 codes and per-vector scales"""
+    return codes.astype(np.float32) * np.asarray(scales, dtype=np.float32)[:, None]
@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+from config import Config
+
+class QueryCache:
+    """per-player cache of vector-store read results.
+
+    entries are keyed by (player_id, write version, method, params). every write for a player
+    bumps its version, so older results are never served again; a bounded LRU evicts across players.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or Config.QUERY_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._player_keys: Dict[str, Set[Tuple]] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def _key(self, player_id: str, method: str, params: Tuple[Hashable, ...]) -> Tuple:
+        return (player_id, self._versions.get(player_id, 0), method, params)
+
+    def get(self, player_id: str, method: str, params: Tuple[Hashable, ...]) -> Tuple[bool, Any]:
+        """return (hit, value)"""
+        with self._lock:
+            key = self._key(player_id, method, params)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return True, self._entries[key]
+            self.stats["misses"] += 1
+            return False, None
+
+    def current_version(self, player_id: str) -> int:
+        with self._lock:
+            return self._versions.get(player_id, 0)
+
+    def put(self, player_id: str, method: str, params: Tuple[Hashable, ...], value: Any, version: int):
+        """store a result loaded at `version`; results that raced with a write are dropped"""
+        with self._lock:
+            if version != self._versions.get(player_id, 0):
+                return
+            key = self._key(player_id, method, params)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._player_keys.setdefault(player_id, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._player_keys.get(old_key[0], set()).discard(old_key)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, player_id: str):
+        """bump the player's write version and drop its cached results"""
+        with self._lock:
+            self._versions[player_id] = self._versions.get(player_id, 0) + 1
+            for key in self._player_keys.pop(player_id, set()):
+                self._entries.pop(key, None)
+            self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0
+            }
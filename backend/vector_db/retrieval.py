@@ -0,0 +1,54 @@
+import time
+from typing import List, Optional, Sequence
+import numpy as np
+
+def recency_weights(timestamps: Sequence[float], half_life_seconds: float, now: Optional[float] = None) -> np.ndarray:
+    """exponential time decay: a turn half_life_seconds old counts half as much as a new one"""
+    now = time.time() if now is None else now
+    ages = np.maximum(now - np.asarray(timestamps, dtype=np.float64), 0.0)
+    if half_life_seconds <= 0:
+        return np.ones_like(ages)
+    return np.power(0.5, ages / half_life_seconds)
+
+def mmr_rerank(
+    query_vector: Sequence[float],
+    candidate_vectors: Sequence[Sequence[float]],
+    timestamps: Sequence[float],
+    top_k: int,
+    lambda_mult: float = 0.5,
+    half_life_seconds: float = 3600.0,
+    now: Optional[float] = None
+) -> List[int]:
+    """re-rank candidates with maximal marginal relevance and recency decay.
+
+    relevance is cosine(query, candidate) scaled by the recency weight; each pick
+    maximizes lambda * relevance - (1 - lambda) * max similarity to already picked items.
+    returns candidate indices in pick order.
+    """
+    if len(candidate_vectors) == 0 or top_k <= 0:
+        return []
+
+    candidates = np.asarray(candidate_vectors, dtype=np.float32)
+    query = np.asarray(query_vector, dtype=np.float32)
+
+    # cosine similarities via normalized dot products
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = (candidates @ query) * recency_weights(timestamps, half_life_seconds, now)
+    pairwise = candidates @ candidates.T
+
+    top_k = min(top_k, len(candidates))
+    selected: List[int] = []
+    available = np.ones(len(candidates), dtype=bool)
+    max_similarity = np.zeros(len(candidates), dtype=np.float32)
+
+    for _ in range(top_k):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, pairwise[best])
+
+    return selected
@@ -1,42 +1,108 @@
-from pinecone import Pinecone, ServerlessSpec
-from langchain_openai import OpenAIEmbeddings
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import os
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
+from vector_db.blob_store import BlobStore
+from vector_db.lexical_index import LexicalIndex
+from vector_db.query_cache import QueryCache
+from vector_db.retrieval import mmr_rerank
+from vector_db.embeddings import EmbeddingProvider, create_embedding_provider, get_embedding_dimension
+from utils.single_flight import single_flight, request_key
+from config import Config
 
 load_dotenv()
 
+# context fields small and useful enough to keep as filterable vector metadata
+FILTERABLE_CONTEXT_FIELDS = ("stage", "game_started", "game_completed", "last_saved")
+
 class VectorStore:
     def __init__(self):
         self.pinecone_api_key = os.getenv("PINECONE_API_KEY")
         self.pinecone_environment = os.getenv("PINECONE_ENVIRONMENT", "us-east-1-aws")
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         
-        if not self.pinecone_api_key or not self.openai_api_key:
-            raise ValueError("PINECONE_API_KEY and OPENAI_API_KEY are required.")
+        if not self.pinecone_api_key:
+            raise ValueError("PINECONE_API_KEY is required.")
+        if Config.EMBEDDING_PROVIDER == "openai" and not self.openai_api_key:
+            raise ValueError("OPENAI_API_KEY is required for OpenAI embeddings.")
         
-        # Initialize Pinecone
-        self.pc = Pinecone(api_key=self.pinecone_api_key)
+        # Local store for full texts and state blobs (kept out of the index metadata)
+        self.blob_store = BlobStore()
         
-        # Initialize embedding model
-        self.embeddings = OpenAIEmbeddings(openai_api_key=self.openai_api_key)
+        # Local full-text index over conversation turns (exact names/places, no embedding needed)
+        self.lexical_index = LexicalIndex()
         
-        # Index name
-        self.index_name = "game-context"
+        # Per-player cache of read results, invalidated by every write of that player
+        self.query_cache = QueryCache()
         
-        # If the index does not exist, create it
-        self._create_index_if_not_exists()
+        # Embedding dimension decides the index the vectors go to
+        self.embedding_dimension = get_embedding_dimension()
+        self.index_name = Config.PINECONE_INDEX_NAME or self._default_index_name()
         
-        # Connect to the index
-        self.index = self.pc.Index(self.index_name)
+        # Pinecone, the embedding model and the index connection are created on first use
+        # (or during warm-up) so that constructing the store never blocks server startup
+        self._pc = None
+        self._embeddings = None
+        self._index = None
+        self._init_lock = threading.Lock()
+    
+    @property
+    def pc(self):
+        """Pinecone client (created on first use)"""
+        if self._pc is None:
+            with self._init_lock:
+                if self._pc is None:
+                    from pinecone import Pinecone
+                    self._pc = Pinecone(api_key=self.pinecone_api_key)
+        return self._pc
+    
+    @property
+    def embeddings(self) -> EmbeddingProvider:
+        """Embedding provider selected by Config.EMBEDDING_PROVIDER (created on first use)"""
+        if self._embeddings is None:
+            with self._init_lock:
+                if self._embeddings is None:
+                    self._embeddings = create_embedding_provider()
+        return self._embeddings
+    
+    def _embed_query(self, text: str) -> List[float]:
+        """embedding of a text; concurrent requests for the same text share one provider call"""
+        provider = self.embeddings
+        return single_flight.run("embedding", request_key(type(provider).__name__, Config.EMBEDDING_MODEL, text),
+                                 lambda: provider.embed_query(text))
+    
+    @property
+    def index(self):
+        """Index connection (the index is created if it does not exist yet)"""
+        if self._index is None:
+            pc = self.pc
+            with self._init_lock:
+                if self._index is None:
+                    self._create_index_if_not_exists()
+                    self._index = pc.Index(self.index_name)
+        return self._index
+    
+    def warm_up(self):
+        """Connects to the index and loads the embedding model ahead of the first request."""
+        self.index
+        self.embeddings
+    
+    def _default_index_name(self) -> str:
+        """Keeps the original index for ada-002 vectors, one index per embedding space otherwise."""
+        if Config.EMBEDDING_PROVIDER == "openai":
+            if Config.EMBEDDING_MODEL == "text-embedding-ada-002":
+                return "game-context"
+            return f"game-context-{Config.EMBEDDING_MODEL}-{self.embedding_dimension}"
+        return f"game-context-{Config.EMBEDDING_PROVIDER}-{self.embedding_dimension}"
     
     def _create_index_if_not_exists(self):
         """If the index does not exist, create it."""
-        if self.index_name not in self.pc.list_indexes().names():
-            self.pc.create_index(
+        if self.index_name not in self._pc.list_indexes().names():
+            from pinecone import ServerlessSpec
+            self._pc.create_index(
                 name=self.index_name,
-                dimension=1536,  # Dimension of OpenAI text-embedding-ada-002
+                dimension=self.embedding_dimension,  # must match the embedding provider
                 metric="cosine",
                 spec=ServerlessSpec(
                     cloud="aws",
@@ -45,7 +111,7 @@ class VectorStore:
             )
             # Wait for the index to be ready
             import time
-            while not self.pc.describe_index(self.index_name).status['ready']:
+            while not self._pc.describe_index(self.index_name).status['ready']:
                 time.sleep(1)
     
     def add_player_context(self, player_id: str, context_data: Dict[str, Any]):
@@ -54,50 +120,57 @@ class VectorStore:
         context_text = self._dict_to_text(context_data)
         
         # Create embedding
-        embedding = self.embeddings.embed_query(context_text)
-        
-        # Create metadata and convert to Pinecone compatible format
-        metadata = self._convert_metadata_for_pinecone({
-            "player_id": player_id,
-            "type": "player_context",
-            "timestamp": str(datetime.now()),
-            "text": context_text,
-            **context_data
-        })
+        embedding = self._embed_query(context_text)
         
         # Create vector ID
         vector_id = f"context_{player_id}_{datetime.now().timestamp()}"
         
+        # Keep only ids and filterable fields in metadata, the full text goes to the local store
+        filterable = {key: context_data[key] for key in FILTERABLE_CONTEXT_FIELDS if key in context_data}
+        metadata = self._build_metadata(player_id, "player_context", **filterable)
+        self.blob_store.put(vector_id, player_id, "player_context", context_text)
+        
         # Save to Pinecone
-        self.index.upsert(
-            vectors=[{
-                "id": vector_id,
-                "values": embedding,
-                "metadata": metadata
-            }]
-        )
+        self._upsert(vector_id, player_id, embedding, metadata)
     
     def add_conversation(self, player_id: str, conversation: Dict[str, str]):
         """Adds conversation to the vector database."""
         conversation_text = f"{conversation['speaker']}: {conversation['message']}"
         
         # Create embedding
-        embedding = self.embeddings.embed_query(conversation_text)
-        
-        # Create metadata
-        metadata = {
-            "player_id": player_id,
-            "type": "conversation",
-            "speaker": conversation["speaker"],
-            "timestamp": conversation.get("timestamp", str(datetime.now())),
-            "message": conversation["message"],
-            "text": conversation_text
-        }
+        embedding = self._embed_query(conversation_text)
         
         # Create vector ID
         vector_id = f"conv_{player_id}_{datetime.now().timestamp()}"
         
+        # Create compact metadata (the message text is stored locally)
+        ts = self._to_epoch(conversation.get("timestamp"))
+        metadata = self._build_metadata(
+            player_id,
+            "conversation",
+            speaker=conversation["speaker"],
+            subtype=conversation.get("type"),
+            ts=ts
+        )
+        self.blob_store.put(vector_id, player_id, "conversation", conversation_text)
+        self.lexical_index.add(vector_id, player_id, conversation["speaker"], ts, conversation_text)
+        
         # Save to Pinecone
+        self._upsert(vector_id, player_id, embedding, metadata)
+    
+    def save_game_state(self, player_id: str, game_state_json: str, stage: int):
+        """Saves a game state snapshot: the blob stays local, only a small marker vector is indexed."""
+        vector_id = f"state_{player_id}_{datetime.now().timestamp()}"
+        self.blob_store.put(vector_id, player_id, "game_state", game_state_json)
+        
+        # embed a short description instead of the whole state (it can exceed the embedding input limit)
+        embedding = self._embed_query(f"saved game | stage: {stage}")
+        metadata = self._build_metadata(player_id, "game_state", stage=stage, last_saved=True)
+        
+        self._upsert(vector_id, player_id, embedding, metadata)
+    
+    def _upsert(self, vector_id: str, player_id: str, embedding: List[float], metadata: Dict[str, Any]):
+        """Writes a vector to Pinecone and keeps an int8-quantized copy locally for re-ranking."""
         self.index.upsert(
             vectors=[{
                 "id": vector_id,
@@ -105,11 +178,46 @@ class VectorStore:
                 "metadata": metadata
             }]
         )
+        self.blob_store.put_vector(vector_id, player_id, embedding)
+        self.query_cache.invalidate(player_id)
+    
+    def add_player_summary(self, player_id: str, summary_text: str):
+        """Writes the single summary vector a compacted player keeps."""
+        vector_id = f"summary_{player_id}"
+        embedding = self._embed_query(summary_text)
+        metadata = self._build_metadata(player_id, "player_summary")
+        self.blob_store.put(vector_id, player_id, "player_summary", summary_text)
+        self._upsert(vector_id, player_id, embedding, metadata)
+    
+    def mark_player_completed(self, player_id: str):
+        """Marks a player's game as completed (its vectors expire after the completed TTL)."""
+        self.blob_store.mark_completed(player_id)
+    
+    def delete_player_data(self, player_id: str) -> int:
+        """Deletes every vector, blob and lexical entry of a player. Returns the number of vectors deleted."""
+        vector_ids = self.blob_store.ids_for_player(player_id)
+        
+        # Pinecone accepts at most 1000 ids per delete call
+        for start in range(0, len(vector_ids), 1000):
+            self.index.delete(ids=vector_ids[start:start + 1000])
+        
+        self.lexical_index.delete_player(player_id)
+        self.blob_store.delete_player(player_id)
+        self.query_cache.invalidate(player_id)
+        return len(vector_ids)
+    
+    def load_game_state(self, player_id: str) -> Optional[str]:
+        """Returns the most recent saved game state JSON of a player."""
+        return self.blob_store.get_latest(player_id, "game_state")
     
     def search_similar_context(self, query: str, player_id: str, top_k: int = 5) -> List[Dict]:
         """Searches for similar contexts."""
+        return self._cached(player_id, "search_similar_context", (query, top_k),
+                            lambda: self._search_similar_context(query, player_id, top_k))
+    
+    def _search_similar_context(self, query: str, player_id: str, top_k: int) -> List[Dict]:
         # Create query embedding
-        query_embedding = self.embeddings.embed_query(query)
+        query_embedding = self._embed_query(query)
         
         # Search in Pinecone
         results = self.index.query(
@@ -119,21 +227,65 @@ class VectorStore:
             include_metadata=True
         )
         
-        # Format results
-        formatted_results = []
-        for match in results.matches:
-            formatted_results.append({
-                "content": match.metadata.get("text", ""),
-                "metadata": match.metadata,
-                "score": match.score
-            })
+        return self._format_matches(results.matches)
+    
+    def retrieve_relevant_context(self, query: str, player_id: str, top_k: Optional[int] = None,
+                                  exclude_texts: Optional[List[str]] = None) -> List[Dict]:
+        """Retrieves a small, diverse set of past turns relevant to the query (MMR + recency decay)."""
+        top_k = top_k or Config.RETRIEVAL_TOP_K
+        exclude_texts = set(exclude_texts or [])
+        return self._cached(player_id, "retrieve_relevant_context", (query, top_k, tuple(sorted(exclude_texts))),
+                            lambda: self._retrieve_relevant_context(query, player_id, top_k, exclude_texts))
+    
+    def _retrieve_relevant_context(self, query: str, player_id: str, top_k: int, exclude_texts: set) -> List[Dict]:
+        query_embedding = self._embed_query(query)
         
-        return formatted_results
+        # over-fetch candidate ids, then re-rank locally with the int8 vector copies
+        # (the query response carries no vector values)
+        results = self.index.query(
+            vector=query_embedding,
+            top_k=Config.RETRIEVAL_FETCH_K,
+            filter={"player_id": player_id, "type": "conversation"},
+            include_metadata=True
+        )
+        
+        candidates = [item for item in self._format_matches(results.matches) if item["content"] not in exclude_texts]
+        if not candidates:
+            return []
+        
+        local_vectors = self.blob_store.get_vectors([item["id"] for item in candidates])
+        missing_ids = [item["id"] for item in candidates if item["id"] not in local_vectors]
+        if missing_ids:
+            # vectors written before the local copy existed are fetched from the index once
+            fetched = self.index.fetch(ids=missing_ids)
+            for vector_id, vector in fetched.vectors.items():
+                local_vectors[vector_id] = vector.values
+                self.blob_store.put_vector(vector_id, player_id, vector.values)
+        
+        candidates = [item for item in candidates if item["id"] in local_vectors]
+        vectors = [local_vectors[item["id"]] for item in candidates]
+        order = mmr_rerank(
+            query_embedding,
+            vectors,
+            [item["metadata"].get("ts", 0) for item in candidates],
+            top_k,
+            lambda_mult=Config.RETRIEVAL_MMR_LAMBDA,
+            half_life_seconds=Config.RETRIEVAL_HALF_LIFE_SECONDS
+        )
+        
+        # present the picked turns in chronological order
+        selected = [candidates[i] for i in order]
+        selected.sort(key=lambda x: x["metadata"].get("ts", 0))
+        return selected
     
     def get_player_history(self, player_id: str, limit: int = 20) -> List[Dict]:
         """Gets the entire history of a player."""
+        return self._cached(player_id, "get_player_history", (limit,),
+                            lambda: self._get_player_history(player_id, limit))
+    
+    def _get_player_history(self, player_id: str, limit: int) -> List[Dict]:
         # Search for all player-related data (full search with empty query)
-        dummy_embedding = [0.0] * 1536  # 1536-dimensional 0 vector
+        dummy_embedding = [0.0] * self.embedding_dimension  # 0 vector of the index dimension
         
         results = self.index.query(
             vector=dummy_embedding,
@@ -142,19 +294,56 @@ class VectorStore:
             include_metadata=True
         )
         
+        history = self._format_matches(results.matches)
+        
         # Sort by timestamp
-        history = []
-        for match in results.matches:
-            history.append({
-                "content": match.metadata.get("text", ""),
+        history.sort(key=lambda x: x["metadata"].get("ts", 0))
+        
+        return history
+    
+    def _cached(self, player_id: str, method: str, params: tuple, loader) -> List[Dict]:
+        """Serves a read from the per-player query cache, loading it on a miss."""
+        version = self.query_cache.current_version(player_id)
+        hit, value = self.query_cache.get(player_id, method, params)
+        if hit:
+            return value
+        value = loader()
+        self.query_cache.put(player_id, method, params, value, version)
+        return value
+    
+    def _format_matches(self, matches) -> List[Dict]:
+        """Formats query matches, fetching their texts from the local store."""
+        texts = self.blob_store.get_many([match.id for match in matches])
+        
+        formatted_results = []
+        for match in matches:
+            formatted_results.append({
+                "id": match.id,
+                "content": texts.get(match.id, ""),
                 "metadata": match.metadata,
                 "score": match.score
             })
         
-        # Sort by timestamp
-        history.sort(key=lambda x: x["metadata"].get("timestamp", ""))
-        
-        return history
+        return formatted_results
+    
+    def _build_metadata(self, player_id: str, record_type: str, **fields) -> Dict[str, Any]:
+        """Builds the compact metadata schema: ids and filterable fields only."""
+        metadata = {
+            "player_id": player_id,
+            "type": record_type,
+            "ts": datetime.now().timestamp()
+        }
+        metadata.update(fields)
+        return self._convert_metadata_for_pinecone(metadata)
+    
+    def _to_epoch(self, timestamp: Optional[str]) -> float:
+        """Converts an ISO timestamp to epoch seconds (falls back to now)."""
+        if timestamp:
+            try:
+                return datetime.fromisoformat(timestamp).timestamp()
+            except ValueError:
+                pass
+        return datetime.now().timestamp()
     
     def _convert_metadata_for_pinecone(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Converts metadata to Pinecone compatible format."""
@@ -4,6 +4,7 @@ extends Node
 class_name GameAPI
 
 const BASE_URL = "http://localhost:8000"
+const MAX_RETRIES = 2
 
 var http_request: HTTPRequest
 var current_player_id: String = ""
@@ -22,17 +23,44 @@ func _ready():
 	http_request.request_completed.connect(_on_request_completed)
 
 var pending_requests: Dictionary = {}
+# last request, resent with the same Idempotency-Key when the network fails
+var last_request: Dictionary = {}
+var retry_count: int = 0
 
-func create_new_game():
-	"""creating new game"""
-	var request_id = "new_game"
-	pending_requests[request_id] = "new_game"
+func _new_idempotency_key() -> String:
+	"""random key identifying one user action (reused for its retries)"""
+	return Crypto.new().generate_random_bytes(16).hex_encode()
+
+func _send_request(request_type: String, path: String, json_data: String = "", idempotent: bool = false) -> int:
+	"""send a POST request; state-changing requests carry an Idempotency-Key so retries are not applied twice"""
+	last_request = {
+		"type": request_type,
+		"path": path,
+		"body": json_data,
+		"idempotency_key": _new_idempotency_key() if idempotent else ""
+	}
+	retry_count = 0
+	return _send_last_request()
+
+func _send_last_request() -> int:
+	pending_requests[last_request["type"]] = last_request["type"]
+	
+	var headers = []
+	if last_request["body"] != "":
+		headers.append("Content-Type: application/json")
+	if last_request["idempotency_key"] != "":
+		headers.append("Idempotency-Key: " + last_request["idempotency_key"])
 	
-	var error = http_request.request(
-		BASE_URL + "/game/new",
-		[],
-		HTTPClient.METHOD_POST
+	return http_request.request(
+		BASE_URL + last_request["path"],
+		headers,
+		HTTPClient.METHOD_POST,
+		last_request["body"]
 	)
+
+func create_new_game():
+	"""creating new game"""
+	var error = _send_request("new_game", "/game/new", "", true)
 	
 	if error != OK:
 		emit_signal("error_occurred", "Game creation request failed: " + str(error))
@@ -47,23 +75,13 @@ func send_chat_message(message: String):
 		emit_signal("error_occurred", "Game not started")
 		return
 	
-	var request_id = "chat"
-	pending_requests[request_id] = "chat"
-	print("💬 pending_requests 설정됨: ", pending_requests)
-	
 	var json_data = JSON.stringify({
 		"player_id": current_player_id,
 		"message": message
 	})
 	print("💬 JSON data to be sent: ", json_data)
 	
-	var headers = ["Content-Type: application/json"]
-	var error = http_request.request(
-		BASE_URL + "/game/chat",
-		headers,
-		HTTPClient.METHOD_POST,
-		json_data
-	)
+	var error = _send_request("chat", "/game/chat", json_data, true)
 	
 	if error != OK:
 		print("❌ HTTP request failed: ", error)
@@ -77,14 +95,7 @@ func advance_to_next_stage():
 		emit_signal("error_occurred", "game has not started")
 		return
 	
-	var request_id = "next_stage"
-	pending_requests[request_id] = "next_stage"
-	
-	var error = http_request.request(
-		BASE_URL + "/game/next-stage/" + current_player_id,
-		[],
-		HTTPClient.METHOD_POST
-	)
+	var error = _send_request("next_stage", "/game/next-stage/" + current_player_id, "", true)
 	
 	if error != OK:
 		emit_signal("error_occurred", "Stage progression request failed: " + str(error))
@@ -95,9 +106,24 @@ func _on_request_completed(result: int, response_code: int, headers: PackedStrin
 	
 	if result != HTTPRequest.RESULT_SUCCESS:
 		print("❌ Network error: ", result)
+		if retry_count < MAX_RETRIES and not last_request.is_empty():
+			# same Idempotency-Key: the server replays the response if the first attempt was applied
+			retry_count += 1
+			print("🔁 retrying ", last_request["type"], " (", retry_count, "/", MAX_RETRIES, ")")
+			await get_tree().create_timer(0.5 * retry_count).timeout
+			_send_last_request()
+			return
 		emit_signal("error_occurred", "Network error: " + str(result))
 		return
 	
+	if response_code == 409 and retry_count < MAX_RETRIES and not last_request.is_empty():
+		# another server worker changed the game at the same time: retry on the latest state
+		retry_count += 1
+		print("🔁 state conflict, retrying ", last_request["type"], " (", retry_count, "/", MAX_RETRIES, ")")
+		await get_tree().create_timer(0.2 * retry_count).timeout
+		_send_last_request()
+		return
+	
 	if response_code != 200:
 		print("❌ Server error: HTTP ", response_code)
 		emit_signal("error_occurred", "Server error: HTTP " + str(response_code))
@@ -231,14 +257,7 @@ func enemy_defeated():
 		emit_signal("error_occurred", "Game has not been started")
 		return
 	
-	var request_id = "enemy_defeated"
-	pending_requests[request_id] = "enemy_defeated"
-	
-	var error = http_request.request(
-		BASE_URL + "/game/enemy-defeated/" + current_player_id,
-		[],
-		HTTPClient.METHOD_POST
-	)
+	var error = _send_request("enemy_defeated", "/game/enemy-defeated/" + current_player_id, "", true)
 	
 	if error != OK:
 		emit_signal("error_occurred", "Enemy defeat request failed: " + str(error))
@@ -249,14 +268,7 @@ func reset_enemy_status():
 		emit_signal("error_occurred", "Game has not been started")
 		return
 	
-	var request_id = "reset_enemy"
-	pending_requests[request_id] = "reset_enemy"
-	
-	var error = http_request.request(
-		BASE_URL + "/game/reset-enemy-status/" + current_player_id,
-		[],
-		HTTPClient.METHOD_POST
-	)
+	var error = _send_request("reset_enemy", "/game/reset-enemy-status/" + current_player_id)
 	
 	if error != OK:
 		emit_signal("error_occurred", "Enemy reset request failed: " + str(error))